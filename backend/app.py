@@ -1,3 +1,4 @@
+import threading
 from flask import Flask
 from flask_cors import CORS
 from dotenv import load_dotenv
@@ -6,13 +7,24 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Imports AFTER env loaded
-from services.db import get_db
+from utils.logging_setup import configure_logging, init_request_logging, logging_stats
+from services.property_index import start_property_index
+from services.prompt_builder import load_tokenizer
+from services.fuzzy_index import fuzzy_index, start_fuzzy_index
+from services.llm import start_agent_warmup
+from services.cache import response_cache
+from services.rate_limiter import llm_scheduler
+from services.user_service import inquiry_writer
+from services.email_service import email_queue
+from utils.auth_middleware import token_cache
+from utils.metrics import init_metrics, register_stats
 from routes.auth_routes import auth_bp
 from routes.property_routes import property_bp
 from routes.chat_routes import chat_bp
 
 
 def create_app():
+    configure_logging()
     app = Flask(__name__)
     
     # Enable CORS for frontend (any Vercel deployment + local dev + new EC2)
@@ -24,8 +36,27 @@ def create_app():
         "http://52.66.79.240:3000"
     ], supports_credentials=True)
 
-    # Start Mongo connection
-    get_db()
+    # Optional in-memory search index, built in the background
+    start_property_index()
+    # Alias/typo-tolerant city and title matching, built in the background
+    start_fuzzy_index()
+
+    # Load (or fail over from) the tokenizer before the first chat needs it
+    threading.Thread(target=load_tokenizer, name="tokenizer-load", daemon=True).start()
+
+    # The chat agent stack loads lazily; optionally warm it off the request path
+    start_agent_warmup()
+
+    # Request ids for log correlation, request timing and /metrics
+    init_request_logging(app)
+    init_metrics(app)
+    register_stats("logging", logging_stats)
+    register_stats("chat_cache", response_cache.stats)
+    register_stats("llm_scheduler", llm_scheduler.stats)
+    register_stats("inquiry_writer", inquiry_writer.stats)
+    register_stats("email_queue", email_queue.stats)
+    register_stats("jwt_cache", token_cache.stats)
+    register_stats("fuzzy_index", fuzzy_index.stats)
 
     # Register Blueprints
     app.register_blueprint(auth_bp, url_prefix="/auth")
@@ -39,7 +70,30 @@ def create_app():
     return app
 
 
-app = create_app()
+_app = None
+_app_lock = threading.Lock()
+
+
+def __getattr__(name):
+    # `from app import app` builds the app on first use instead of at import:
+    # forkserver password-hashing workers re-import __main__ and must not
+    # start their own indexes, warmup threads and queues
+    global _app
+    if name != "app":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _app_lock:
+        if _app is None:
+            _app = create_app()
+    return _app
+
 
 if __name__ == "__main__":
+    from config import Config
+
+    app = create_app()
+
+    if Config.MIGRATE_ON_START:
+        from services.migrations import run_migrations
+        run_migrations()
+
     app.run(host="0.0.0.0", port=5016, debug=True)
@@ -0,0 +1,70 @@
+"""Micro-benchmark: per-request cost of token_required with and without the decode cache.
+
+Times a bare jwt.decode against a cache hit, then drives a trivial Flask
+route guarded by token_required through the test client so the numbers
+include header parsing and the decorator itself.
+
+Usage (from backend/):
+    python benchmarks/auth_overhead.py --iterations 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+from flask import Flask
+from config import Config
+from utils.auth_middleware import token_cache, decode_token, token_required
+from utils.token_utils import generate_access_token
+
+
+def per_call_us(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    token = generate_access_token("bench@example.com", "buyer")
+
+    app = Flask(__name__)
+
+    @app.route("/ping")
+    @token_required
+    def ping():
+        return "ok"
+
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def request_once():
+        assert client.get("/ping", headers=headers).status_code == 200
+
+    print(f"{'':24} {'us/call':>10}")
+    decode = per_call_us(lambda: jwt.decode(token, Config.JWT_SECRET, algorithms=["HS256"]), args.iterations)
+    print(f"{'jwt.decode':24} {decode:10.2f}")
+    decode_token(token)
+    cached = per_call_us(lambda: decode_token(token), args.iterations)
+    print(f"{'decode_token (hit)':24} {cached:10.2f}")
+
+    max_entries = token_cache.max_entries
+    token_cache.max_entries = 0
+    token_cache.clear()
+    uncached_request = per_call_us(request_once, args.iterations)
+    token_cache.max_entries = max_entries
+    cached_request = per_call_us(request_once, args.iterations)
+    print(f"{'request, cache off':24} {uncached_request:10.2f}")
+    print(f"{'request, cache on':24} {cached_request:10.2f}")
+    print(f"auth overhead saved per request: {uncached_request - cached_request:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
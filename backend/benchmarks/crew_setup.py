@@ -0,0 +1,68 @@
+"""Micro-benchmark: per-message CrewAI setup cost, before and after pooling.
+
+"before" mirrors the old process_chat_message: a new Task and Crew around a
+shared agent for every message. "after" leases a warm crew from the pool and
+interpolates the per-request inputs, which is what kickoff(inputs=...) does
+before the first LLM call. No LLM requests are made.
+
+Usage (from backend/):
+    python benchmarks/crew_setup.py --iterations 200
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from crewai import Task, Crew, Process, LLM
+from services.concierge import (
+    ConciergePipelinePool,
+    build_concierge_agent,
+    build_concierge_crew
+)
+
+
+def per_message_setup(agent, message):
+    task = Task(
+        description=f"Msg: '{message}' | History: No history provided.\nRules: if 'MANDATORY_JSON_RESULTS' found, use ONLY JSON block. No descriptions.",
+        expected_output="Text + JSON block.",
+        agent=agent
+    )
+    return Crew(agents=[agent], tasks=[task], process=Process.sequential)
+
+
+def pooled_setup(pool, message):
+    with pool.lease() as crew:
+        crew._interpolate_inputs({"message": message, "history": "No history provided."})
+        return crew
+
+
+def measure(label, fn, iterations):
+    fn(0)  # exclude one-off imports and warmup
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed / iterations * 1000:8.3f} ms/message  ({iterations} iterations)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    llm = LLM(model="groq/llama-3.1-8b-instant", temperature=0)
+    agent = build_concierge_agent(llm, [])
+    pool = ConciergePipelinePool(lambda: build_concierge_crew(llm, []), size=1)
+    pool.warm()
+
+    before = measure("before", lambda i: per_message_setup(agent, f"2BHK in Pune #{i}"), args.iterations)
+    after = measure("after", lambda i: pooled_setup(pool, f"2BHK in Pune #{i}"), args.iterations)
+    print(f"speedup      {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Local stand-in for Groq's OpenAI-compatible chat completions API.
+
+Answers POST /chat/completions (and /openai/v1/chat/completions) after a
+configurable latency, streaming or not, and enforces its own requests-per-
+minute limit by answering 429 with a Retry-After header, the way Groq does.
+--error-rate additionally answers that fraction of requests with a 429.
+Point the backend at it with LLM_BASE_URL and any GROQ_API_KEY:
+
+    python benchmarks/fake_llm_server.py --port 8099 --rpm 30 --latency 0.3
+    LLM_BASE_URL=http://127.0.0.1:8099 GROQ_API_KEY=fake python run_prod.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = "Thought: I can answer directly.\nFinal Answer: Could you tell me which city you'd like to search in?"
+
+
+class FakeLLMState:
+    """Sliding one-minute request window shared by all handler threads."""
+
+    def __init__(self, rpm, latency, error_rate=0.0):
+        self.rpm = rpm
+        self.latency = latency
+        self.error_rate = error_rate
+        self._window = deque()
+        self._lock = threading.Lock()
+        self.counters = {"served": 0, "rate_limited": 0}
+
+    def admit(self):
+        """Returns 0 if the request may proceed, else seconds until the window frees up."""
+        now = time.monotonic()
+        with self._lock:
+            if self.error_rate and random.random() < self.error_rate:
+                self.counters["rate_limited"] += 1
+                return 1.0
+            while self._window and now - self._window[0] >= 60:
+                self._window.popleft()
+            if self.rpm and len(self._window) >= self.rpm:
+                self.counters["rate_limited"] += 1
+                return 60 - (now - self._window[0])
+            self._window.append(now)
+            self.counters["served"] += 1
+            return 0
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._json(200, state.counters)
+            else:
+                self._json(404, {"error": "not found"})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._json(404, {"error": {"message": "not found"}})
+                return
+
+            wait = state.admit()
+            if wait:
+                self._json(429, {
+                    "error": {"message": "Rate limit reached for requests", "type": "requests", "code": "rate_limit_exceeded"}
+                }, {"Retry-After": f"{wait:.2f}"})
+                return
+
+            time.sleep(state.latency)
+            prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+            completion_tokens = len(REPLY) // 4
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            model = body.get("model", "fake")
+
+            if body.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                text = REPLY.split("Final Answer: ", 1)[-1]
+                for i in range(0, len(text), 12):
+                    self._chunk({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                                 "choices": [{"index": 0, "delta": {"content": text[i:i + 12]}, "finish_reason": None}]})
+                self._chunk({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                             "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+                return
+
+            self._json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": REPLY}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens}
+            })
+
+        def _chunk(self, payload):
+            self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode())
+
+        def _write_chunk(self, data):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def serve(port=8099, rpm=30, latency=0.3, error_rate=0.0):
+    """Starts the fake server on a background thread and returns it (port=0 picks a free port)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(FakeLLMState(rpm, latency, error_rate)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-llm", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--rpm", type=int, default=30, help="requests per minute before answering 429 (0 = unlimited)")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before each answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(FakeLLMState(args.rpm, args.latency, args.error_rate)))
+    print(f"Fake LLM server on http://127.0.0.1:{args.port} (rpm={args.rpm}, latency={args.latency}s)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Import-time profile of a worker's startup imports (python -X importtime).
+
+Imports the app module in a fresh interpreter with -X importtime, then
+prints the total import time, the slowest top-level packages, and whether
+the agent stack (crewai / litellm / langchain) was loaded. Pass --agent to
+also import services.agent_stack, i.e. the cost the first /chat request
+now pays instead of every worker at boot.
+
+Usage (from backend/):
+    python benchmarks/import_profile.py --top 15
+    python benchmarks/import_profile.py --agent
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGENT_PACKAGES = ("crewai", "litellm", "langchain", "langchain_core", "langchain_groq")
+
+
+def profile(modules):
+    """Returns {module: self_us} for every import made while loading `modules`."""
+    code = "; ".join(f"import {m}" for m in modules)
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND,
+        env={**os.environ, "PROPERTY_INDEX_ENABLED": "false", "CHAT_WARMUP": "false"},
+        capture_output=True,
+        text=True
+    )
+    if out.returncode != 0:
+        raise SystemExit(out.stderr.strip().splitlines()[-1])
+
+    timings = {}
+    for line in out.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = int(self_us)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--agent", action="store_true", help="also import services.agent_stack")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    modules = [args.module] + (["services.agent_stack"] if args.agent else [])
+    timings = profile(modules)
+
+    # Self times summed per top-level package add up to the whole import
+    packages = defaultdict(int)
+    for name, self_us in timings.items():
+        packages[name.split(".")[0]] += self_us
+
+    print(f"imports: {', '.join(modules)}")
+    print(f"total import time: {sum(packages.values()) / 1000:.1f} ms")
+    print(f"{'package':<24} {'ms':>8}")
+    for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{name:<24} {us / 1000:8.1f}")
+
+    loaded = sorted({name.split(".")[0] for name in timings} & set(AGENT_PACKAGES))
+    print(f"agent stack loaded: {', '.join(loaded) if loaded else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""Load test: replay a realistic request mix against the app under waitress.
+
+Starts create_app() under waitress in-process, a fake Groq-compatible LLM
+server (benchmarks/fake_llm_server.py) and either a local mongod or
+mongomock, seeds listings and users, then drives a weighted mix of
+/chat, /properties/search, /properties/market/<city>, /auth/login and
+/auth/refresh from concurrent clients. Prints p50/p95/p99 latency and RPS
+per endpoint and writes them to JSON; --compare prints the change against
+an earlier run. --mongo mongomock needs `pip install mongomock`; /chat
+messages that reach the agent need the full requirements (CrewAI).
+
+Usage (from backend/):
+    python benchmarks/load_test.py --mongo mongomock --duration 30 --out run.json
+    python benchmarks/load_test.py --mongo mongodb://localhost:27017 --compare run.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+CITIES = ["Pune", "Mumbai", "Bangalore", "Hyderabad", "Chennai", "Delhi"]
+DEFAULT_MIX = "chat=2,search=4,market=2,login=1,refresh=1"
+
+# Structured searches take the fast path; open questions go to the agent
+CHAT_MESSAGES = [
+    "2BHK rent in {city} under 30000",
+    "3 bhk to buy in {city} under 90 lakh",
+    "Hi, what can you help me with?",
+    "I'm looking for a place in {city}",
+]
+
+
+def configure_env(args, llm_url):
+    os.environ["LLM_BASE_URL"] = llm_url
+    os.environ.setdefault("GROQ_API_KEY", "load-test")
+    os.environ["DB_NAME"] = args.db_name
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    if args.mongo == "mongomock":
+        import mongomock
+        import pymongo
+        os.environ.setdefault("MONGO_URL", "mongodb://localhost")
+        pymongo.MongoClient = mongomock.MongoClient
+    else:
+        os.environ["MONGO_URL"] = args.mongo
+
+
+def seed(listings, users, rng):
+    from models.property_model import build_property_doc, insert_properties
+    from models.user_model import create_user
+    from services.migrations import run_migrations
+
+    run_migrations()
+
+    docs = [build_property_doc({
+        "title": f"Listing {i}",
+        "city": rng.choice(CITIES),
+        "price": rng.randrange(8000, 15000000, 500),
+        "bedrooms": rng.randint(1, 4),
+        "action": rng.choice(["Buy", "Rent"])
+    }) for i in range(listings)]
+    insert_properties(docs)
+
+    accounts = []
+    for i in range(users):
+        email = f"load{i}@example.com"
+        try:
+            create_user({"name": f"Load {i}", "email": email, "password": "loadtest123",
+                         "phone": "9999999999", "city": rng.choice(CITIES)})
+        except Exception:
+            pass  # already seeded in a real mongod
+        accounts.append(email)
+    return accounts
+
+
+def start_app(threads):
+    from waitress.server import create_server
+    from app import create_app
+
+    server = create_server(create_app(), host="127.0.0.1", port=0, threads=threads)
+    threading.Thread(target=server.run, name="waitress", daemon=True).start()
+    return server, server.effective_port
+
+
+class Client:
+    """One keep-alive connection plus the tokens of the user it plays."""
+
+    def __init__(self, port, email):
+        self.port = port
+        self.email = email
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        self.access = None
+        self.refresh = None
+
+    def request(self, method, path, body=None, token=None):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        payload = json.dumps(body) if body is not None else None
+        try:
+            self.conn.request(method, path, payload, headers)
+            response = self.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # Server closed the keep-alive connection; retry once on a new one
+            self.conn.close()
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+            self.conn.request(method, path, payload, headers)
+            response = self.conn.getresponse()
+        data = response.read()
+        return response.status, data
+
+    def login(self):
+        status, data = self.request("POST", "/auth/login", {"email": self.email, "password": "loadtest123"})
+        if status == 200:
+            tokens = json.loads(data)
+            self.access, self.refresh = tokens["access_token"], tokens["refresh_token"]
+        return status
+
+
+def run_operation(client, name, rng):
+    city = rng.choice(CITIES)
+    if name == "login":
+        return client.login()
+    if name == "refresh":
+        status, data = client.request("POST", "/auth/refresh", {"refresh_token": client.refresh})
+        if status == 200:
+            client.access = json.loads(data)["access_token"]
+        return status
+    if name == "search":
+        query = f"city={city}&minPrice={rng.randrange(0, 50000, 5000)}&sortBy=price&limit=20"
+        return client.request("GET", f"/properties/search?{query}", token=client.access)[0]
+    if name == "market":
+        return client.request("GET", f"/properties/market/{city}", token=client.access)[0]
+    if name == "chat":
+        message = rng.choice(CHAT_MESSAGES).format(city=city)
+        return client.request("POST", "/chat", {"message": message}, token=client.access)[0]
+    raise ValueError(name)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples, elapsed):
+    report = {}
+    for name, entries in sorted(samples.items()):
+        latencies = sorted(ms for ms, _ in entries)
+        errors = sum(1 for _, status in entries if status >= 400)
+        report[name] = {
+            "requests": len(entries),
+            "errors": errors,
+            "rps": round(len(entries) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2)
+        }
+    return report
+
+
+def print_report(report, baseline=None):
+    print(f"{'endpoint':<10} {'reqs':>7} {'errors':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in report.items():
+        print(f"{name:<10} {row['requests']:>7} {row['errors']:>7} {row['rps']:>8} "
+              f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+        old = (baseline or {}).get(name)
+        if old:
+            deltas = []
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+                if old.get(key):
+                    deltas.append(f"{key} {(row[key] - old[key]) / old[key] * 100:+.1f}%")
+            print(f"{'':<10} vs baseline: {', '.join(deltas)}")
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo", default="mongomock", help='"mongomock" or a mongodb:// URL')
+    parser.add_argument("--db-name", default="loadtest_db")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load after warmup")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent simulated users")
+    parser.add_argument("--threads", type=int, default=8, help="waitress worker threads")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint weights (default {DEFAULT_MIX})")
+    parser.add_argument("--listings", type=int, default=5000)
+    parser.add_argument("--bcrypt-rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", 10)))
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--llm-rpm", type=int, default=0, help="fake server RPM limit (0 = unlimited)")
+    parser.add_argument("--llm-429-rate", type=float, default=0.0, help="fraction of LLM calls answered 429")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    mix = {}
+    for part in args.mix.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+
+    from fake_llm_server import serve as serve_fake_llm
+    llm_server = serve_fake_llm(port=0, rpm=args.llm_rpm, latency=args.llm_latency, error_rate=args.llm_429_rate)
+    configure_env(args, f"http://127.0.0.1:{llm_server.server_address[1]}")
+
+    rng = random.Random(args.seed)
+    accounts = seed(args.listings, args.concurrency, rng)
+    _, port = start_app(args.threads)
+
+    clients = [Client(port, email) for email in accounts]
+    for client in clients:
+        client.login()
+
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    names, weights = list(mix), list(mix.values())
+    stop_at = time.monotonic() + args.duration
+
+    def worker(client, worker_seed):
+        local_rng = random.Random(worker_seed)
+        while time.monotonic() < stop_at:
+            name = local_rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                status = run_operation(client, name, local_rng)
+            except Exception:
+                status = 599
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with lock:
+                samples[name].append((elapsed_ms, status))
+
+    started = time.monotonic()
+    workers = [threading.Thread(target=worker, args=(c, args.seed + i)) for i, c in enumerate(clients)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    report = summarize(samples, elapsed)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["endpoints"]
+    print_report(report, baseline)
+
+    if args.out:
+        result = {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+            "elapsed_s": round(elapsed, 2),
+            "endpoints": report
+        }
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {args.out}")
+
+    # waitress and the fake LLM run on daemon threads and stop with the process
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark: bcrypt login throughput against the number of hashing workers.
+
+Simulates a login burst by verifying a password from many request threads
+at once, first inline on the request threads (the old behaviour) and then
+through PasswordHasher process pools of 1..N workers.
+
+Usage (from backend/):
+    python benchmarks/login_throughput.py --rounds 12 --logins 64 --threads 16
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt
+from utils.security import PasswordHasher
+
+
+def run_burst(hasher, hashed, logins, threads):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda _: hasher.verify("correct horse", hashed), range(logins)))
+        elapsed = time.perf_counter() - start
+    assert all(results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=16, help="concurrent request threads")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    hashed = bcrypt.hashpw(b"correct horse", bcrypt.gensalt(args.rounds))
+    print(f"bcrypt cost {args.rounds}, {args.logins} logins from {args.threads} threads, {os.cpu_count()} cores")
+    print(f"{'workers':>8} {'logins/s':>10}")
+
+    inline = PasswordHasher(workers=0, max_pending=args.logins, rounds=args.rounds)
+    print(f"{'inline':>8} {run_burst(inline, hashed, args.logins, args.threads):10.1f}")
+
+    workers = 1
+    while workers <= args.max_workers:
+        hasher = PasswordHasher(workers=workers, max_pending=args.logins, rounds=args.rounds)
+        hasher.verify("correct horse", hashed)  # start the pool outside the timing
+        print(f"{workers:>8} {run_burst(hasher, hashed, args.logins, args.threads):10.1f}")
+        hasher.shutdown()
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark: worker startup time with and without import-time index creation.
+
+Each sample is a fresh interpreter that imports the app module, then times
+the first round trip on the lazily created client and the index creation
+that used to run on every import. "before" is import + indexes, the old
+per-worker cost; "after" is import alone, with indexes left to
+`manage.py migrate`.
+
+Usage (from backend/, against the MONGO_URL in .env):
+    python benchmarks/worker_startup.py --samples 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+from services.db import get_db
+get_db().command("ping")
+connected = time.perf_counter()
+from services.migrations import ensure_indexes
+ensure_indexes()
+indexed = time.perf_counter()
+print(json.dumps({{
+    "import": imported - start,
+    "first_query": connected - imported,
+    "indexes": indexed - connected
+}}))
+"""
+
+
+def sample(module):
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD.format(module=module)],
+        cwd=BACKEND,
+        env={**os.environ, "PROPERTY_INDEX_ENABLED": "false"},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--module", default="app", help="module a worker imports on startup")
+    args = parser.parse_args()
+
+    runs = [sample(args.module) for _ in range(args.samples)]
+
+    def median_ms(key):
+        return statistics.median(r[key] for r in runs) * 1000
+
+    imported, indexes = median_ms("import"), median_ms("indexes")
+    print(f"median of {args.samples} workers (ms)")
+    print(f"  import {args.module:<18} {imported:8.1f}")
+    print(f"  first query             {median_ms('first_query'):8.1f}")
+    print(f"  create indexes          {indexes:8.1f}")
+    print(f"before (import + indexes) {imported + indexes:8.1f}")
+    print(f"after  (import only)      {imported:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
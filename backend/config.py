@@ -12,5 +12,99 @@ class Config:
     # Database Name
     DB_NAME = os.getenv("DB_NAME", "realestate_db")
 
+    # MongoClient pool. Compressors need the matching driver extra
+    # (pymongo[zstd] / pymongo[snappy]); leave empty to disable compression.
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 0)) or None
+    MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "")
+    MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+
+    # Create indexes when run_prod.py / app.py start; turn off when `manage.py migrate`
+    # runs as a separate deploy step
+    MIGRATE_ON_START = os.getenv("MIGRATE_ON_START", "true").lower() == "true"
+
     # JWT Secret (ensure it is at least 32 bytes for SHA256)
     JWT_SECRET = os.getenv("JWT_SECRET", "haven-ai-professional-concierge-secret-key-2026-v1")
+
+    # Verified access tokens kept in the decode cache (0 disables it)
+    JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", 1024))
+
+    # Answer fully specified searches locally instead of calling the LLM
+    CHAT_FAST_PATH = os.getenv("CHAT_FAST_PATH", "true").lower() == "true"
+
+    # Chat response cache: "memory" (per process) or "mongo" (shared by all workers)
+    CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE_ENABLED", "true").lower() == "true"
+    CHAT_CACHE_BACKEND = os.getenv("CHAT_CACHE_BACKEND", "memory").lower()
+    CHAT_CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", 300))
+    CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", 1024))
+
+    # Chat session memory: capped stored turns and the prompt budget for history
+    SESSION_MEMORY_ENABLED = os.getenv("SESSION_MEMORY_ENABLED", "true").lower() == "true"
+    SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", 20))
+    SESSION_TURN_CHARS = int(os.getenv("SESSION_TURN_CHARS", 300))
+    SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", 250))
+
+    # Per-request prompt budget (tokens) and caps for the user message and tool results
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 900))
+    PROMPT_MESSAGE_TOKENS = int(os.getenv("PROMPT_MESSAGE_TOKENS", 200))
+    PROMPT_TOOL_TOKENS = int(os.getenv("PROMPT_TOOL_TOKENS", 300))
+
+    # Groq limits enforced client-side across all threads, and the provider endpoint
+    # (point LLM_BASE_URL at a local OpenAI-compatible fake server for load tests)
+    LLM_RPM = int(os.getenv("LLM_RPM", 30))
+    LLM_TPM = int(os.getenv("LLM_TPM", 6000))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+    LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", 20))
+    LLM_COMPLETION_TOKENS = int(os.getenv("LLM_COMPLETION_TOKENS", 256))
+    LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None
+
+    # Number of warm CrewAI pipelines kept for concurrent chat requests
+    CREW_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", 4))
+
+    # CrewAI is loaded on the first /chat request; set to preload it in the background at startup
+    CHAT_WARMUP = os.getenv("CHAT_WARMUP", "false").lower() == "true"
+
+    # Listings returned by the agent search and by /properties/recommend
+    NEAREST_PRICE_K = int(os.getenv("NEAREST_PRICE_K", 2))
+    RECOMMEND_K = int(os.getenv("RECOMMEND_K", 5))
+
+    # Optional NumPy-backed in-memory property index for searches
+    PROPERTY_INDEX_ENABLED = os.getenv("PROPERTY_INDEX_ENABLED", "false").lower() == "true"
+    PROPERTY_INDEX_MAX_AGE = int(os.getenv("PROPERTY_INDEX_MAX_AGE", 300))
+
+    # In-process fuzzy index over listing titles and cities (typos, renamed cities)
+    FUZZY_SEARCH_ENABLED = os.getenv("FUZZY_SEARCH_ENABLED", "true").lower() == "true"
+    FUZZY_INDEX_MAX_AGE = int(os.getenv("FUZZY_INDEX_MAX_AGE", 300))
+    # Ranked candidates fetched for a /properties/search?q= text query
+    FUZZY_SEARCH_LIMIT = int(os.getenv("FUZZY_SEARCH_LIMIT", 200))
+    # Extra city aliases on top of the built-in table, e.g. "gurugram=gurgaon,bombay=mumbai"
+    CITY_ALIASES = os.getenv("CITY_ALIASES", "")
+
+    # Listings per insert_many when bulk importing
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 1000))
+
+    # Write-behind queue for chat inquiry logging
+    INQUIRY_ASYNC = os.getenv("INQUIRY_ASYNC", "true").lower() == "true"
+    INQUIRY_BATCH_SIZE = int(os.getenv("INQUIRY_BATCH_SIZE", 100))
+    INQUIRY_FLUSH_INTERVAL = float(os.getenv("INQUIRY_FLUSH_INTERVAL", 1.0))
+    INQUIRY_QUEUE_MAX = int(os.getenv("INQUIRY_QUEUE_MAX", 10000))
+
+    # Logging: records are queued and written to stdout by a background thread
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # "json" or "text"
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+    # Fraction of high-volume INFO/DEBUG lines (per inquiry, per search) to keep
+    LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 0.1))
+
+    # Request/stage timing histograms on /metrics and Server-Timing headers
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # Password hashing: bcrypt cost and the size of the hashing process pool
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+    BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS")) if os.getenv("BCRYPT_WORKERS") else None
+    BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", 64))
+
+    # Short-lived per-process cache of user profiles for /auth/refresh and /auth/user
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 60))
+    USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", 4096))
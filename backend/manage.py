@@ -0,0 +1,122 @@
+import argparse
+from dotenv import load_dotenv
+
+# Load environment variables FIRST
+load_dotenv()
+
+
+def migrate(args):
+    from services.migrations import run_migrations
+
+    run_migrations()
+
+
+def rebuild_stats(args):
+    from models.market_stats import rebuild_market_stats
+
+    count = rebuild_market_stats()
+    print(f"Rebuilt {count} market stats buckets")
+
+
+def backfill_search_fields(args):
+    from models.property_model import backfill_search_keys
+
+    count = backfill_search_keys()
+    print(f"Backfilled search fields on {count} properties")
+
+
+def _plan_stages(plan):
+    """Flattens a winning plan into its stage names."""
+    stages = [plan.get("stage")]
+    children = list(plan.get("inputStages", []))
+    if plan.get("inputStage"):
+        children.append(plan["inputStage"])
+    for child in children:
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+def explain_search(args):
+    from models.property_model import properties, agent_search_query
+
+    query = agent_search_query(action=args.action, location=args.city, bhk=args.bhk)
+    if args.max_price:
+        query["price"] = {"$lte": args.max_price}
+
+    plan = properties.find(query).sort("price", 1).limit(2).explain()
+    winning = plan["queryPlanner"]["winningPlan"]
+    stages = _plan_stages(winning.get("queryPlan", winning))
+    print(f"Query: {query}")
+    print(f"Plan stages: {' -> '.join(s for s in stages if s)}")
+
+    if "IXSCAN" not in stages:
+        raise SystemExit("Agent search query is not using an index (no IXSCAN in winning plan)")
+    print("OK: agent search query uses an index scan")
+
+
+def import_properties(args):
+    from services.property_import import detect_format, iter_rows, import_listings
+
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        raise SystemExit("Cannot detect format; pass --format csv or --format jsonl")
+
+    with open(args.path, encoding="utf-8", newline="") as f:
+        # Trusted operator import: rows may name their own lister
+        report = import_listings(
+            iter_rows(f, fmt), batch_size=args.batch_size, listed_by=args.listed_by, row_owner=True
+        )
+
+    print(f"Inserted {report['inserted']} properties, {report['failed']} failed")
+    for err in report["errors"]:
+        print(f"  row {err['row']}: {err['error']}")
+
+
+def main():
+    from utils.logging_setup import configure_logging
+
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Haven AI backend maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser(
+        "migrate",
+        help="Create the MongoDB indexes (run once per deploy, before starting workers)"
+    ).set_defaults(func=migrate)
+
+    commands.add_parser(
+        "rebuild-stats",
+        help="Recompute the precomputed market statistics from the properties collection"
+    ).set_defaults(func=rebuild_stats)
+
+    commands.add_parser(
+        "backfill-search-fields",
+        help="Fill the lowercase city/action shadow fields on existing properties"
+    ).set_defaults(func=backfill_search_fields)
+
+    explain = commands.add_parser(
+        "explain-search",
+        help="Check that the agent's property search is served by an index scan"
+    )
+    explain.add_argument("--action", default="Buy")
+    explain.add_argument("--city", default="Pune")
+    explain.add_argument("--bhk", type=int, default=2)
+    explain.add_argument("--max-price", type=float, default=None)
+    explain.set_defaults(func=explain_search)
+
+    importer = commands.add_parser(
+        "import-properties",
+        help="Bulk-load a CSV or JSONL listing feed with batched inserts"
+    )
+    importer.add_argument("path")
+    importer.add_argument("--format", choices=["csv", "jsonl"])
+    importer.add_argument("--batch-size", type=int, default=None)
+    importer.add_argument("--listed-by", default=None)
+    importer.set_defaults(func=import_properties)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
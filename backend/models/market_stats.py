@@ -0,0 +1,259 @@
+from services.db import collection
+from collections import defaultdict
+from threading import Lock
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo import ReplaceOne, UpdateOne
+
+
+# Running totals per city, per (city, bedrooms) and per bedrooms, kept in sync
+# by the property write hooks so market endpoints never scan `properties`.
+properties = collection("properties")
+stats = collection("property_stats")
+
+
+def ensure_indexes():
+    stats.create_index([("scope", 1), ("city", 1)])
+
+
+_bootstrap_lock = Lock()
+_bootstrapped = False
+
+# Bump when bucket ids change so existing stats are rebuilt on first use
+STATS_VERSION = 2
+META_ID = "_meta"
+
+
+def _is_price(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _id_part(value):
+    """Type-tagged bucket id component: 2 and "2" are different buckets, 2 and 2.0 the same (as in $group)."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return f"b:{value}"
+    if _is_price(value):
+        return f"n:{int(value)}" if float(value).is_integer() else f"n:{value!r}"
+    if isinstance(value, str):
+        return f"s:{value}"
+    return f"{type(value).__name__}:{value}"
+
+
+def _bucket_id(key):
+    return "|".join([key["scope"]] + [_id_part(v) for f, v in key.items() if f != "scope"])
+
+
+def _buckets(doc):
+    """Yields (_id, key fields) for every stats bucket a listing belongs to."""
+    city = doc.get("city")
+    bedrooms = doc.get("bedrooms")
+    for key in (
+        {"scope": "city", "city": city},
+        {"scope": "city_bedrooms", "city": city, "bedrooms": bedrooms},
+        {"scope": "bedrooms", "bedrooms": bedrooms},
+    ):
+        yield _bucket_id(key), key
+
+
+def _bucket_match(key):
+    return {field: value for field, value in key.items() if field != "scope"}
+
+
+# ---------- MAINTENANCE ----------
+def apply_changes(added=(), removed=()):
+    """Applies listing inserts/removals to the running totals in one round trip.
+
+    Updates are expressed as a removal of the old document plus an insert of
+    the new one. min/max cannot be decremented, so a bucket whose extreme
+    price was removed is recomputed from its own (indexed) listings.
+    """
+    if _ensure_bootstrapped():
+        # The rebuild already reflects the write that triggered it
+        return
+
+    deltas = defaultdict(lambda: {"count": 0, "priced": 0, "sum": 0, "added": [], "removed": []})
+    keys = {}
+
+    for sign, docs in ((1, added), (-1, removed)):
+        for doc in docs:
+            price = doc.get("price")
+            for bucket_id, key in _buckets(doc):
+                keys[bucket_id] = key
+                delta = deltas[bucket_id]
+                delta["count"] += sign
+                if _is_price(price):
+                    delta["priced"] += sign
+                    delta["sum"] += sign * price
+                    delta["added" if sign > 0 else "removed"].append(price)
+
+    ops = []
+    recheck = []
+    for bucket_id, delta in deltas.items():
+        # An update that did not move the listing between buckets nets out
+        if not delta["count"] and not delta["priced"] and sorted(delta["added"]) == sorted(delta["removed"]):
+            continue
+
+        update = {
+            "$set": keys[bucket_id],
+            "$inc": {"count": delta["count"], "priced": delta["priced"], "sum": delta["sum"]}
+        }
+        if delta["added"]:
+            update["$min"] = {"min": min(delta["added"])}
+            update["$max"] = {"max": max(delta["added"])}
+
+        ops.append(UpdateOne({"_id": bucket_id}, update, upsert=True))
+        if delta["removed"]:
+            recheck.append((bucket_id, delta["removed"]))
+
+    if ops:
+        stats.bulk_write(ops, ordered=False)
+
+    for bucket_id, removed_prices in recheck:
+        _recheck_bucket(bucket_id, keys[bucket_id], removed_prices)
+
+
+def _recheck_bucket(bucket_id, key, removed_prices):
+    bucket = stats.find_one({"_id": bucket_id})
+    if not bucket:
+        return
+
+    if bucket.get("count", 0) <= 0:
+        stats.delete_one({"_id": bucket_id})
+        return
+
+    low, high = bucket.get("min"), bucket.get("max")
+    if low is None or any(p <= low or p >= high for p in removed_prices):
+        result = list(properties.aggregate([
+            {"$match": {**_bucket_match(key), "price": {"$type": "number"}}},
+            {"$group": {"_id": None, "min": {"$min": "$price"}, "max": {"$max": "$price"}}}
+        ]))
+        if result:
+            stats.update_one({"_id": bucket_id}, {"$set": {"min": result[0]["min"], "max": result[0]["max"]}})
+        else:
+            stats.update_one({"_id": bucket_id}, {"$unset": {"min": "", "max": ""}})
+
+
+def rebuild_market_stats():
+    """Recomputes every bucket from scratch with one pass per scope."""
+    docs = []
+    for scope, group_id in (
+        ("city", {"city": "$city"}),
+        ("city_bedrooms", {"city": "$city", "bedrooms": "$bedrooms"}),
+        ("bedrooms", {"bedrooms": "$bedrooms"}),
+    ):
+        pipeline = [
+            {"$group": {
+                "_id": group_id,
+                "count": {"$sum": 1},
+                "priced": {"$sum": {"$cond": [{"$isNumber": "$price"}, 1, 0]}},
+                "sum": {"$sum": "$price"},
+                "min": {"$min": {"$cond": [{"$isNumber": "$price"}, "$price", None]}},
+                "max": {"$max": {"$cond": [{"$isNumber": "$price"}, "$price", None]}}
+            }}
+        ]
+        for row in properties.aggregate(pipeline, allowDiskUse=True):
+            key = {"scope": scope, **{field: row["_id"].get(field) for field in group_id}}
+            doc = {"_id": _bucket_id(key), **key, "count": row["count"], "priced": row["priced"], "sum": row["sum"]}
+            if row["min"] is not None:
+                doc["min"], doc["max"] = row["min"], row["max"]
+            docs.append(doc)
+
+    # Upserts instead of delete + insert, so concurrent rebuilds (two workers
+    # bootstrapping at once) overwrite each other instead of colliding
+    ops = [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs]
+    ops.append(ReplaceOne({"_id": META_ID}, {"_id": META_ID, "version": STATS_VERSION}, upsert=True))
+    stats.bulk_write(ops, ordered=False)
+    stats.delete_many({"_id": {"$nin": [doc["_id"] for doc in docs] + [META_ID]}})
+    return len(docs)
+
+
+def _ensure_bootstrapped():
+    """Builds the stats once for catalogs that predate incremental maintenance.
+
+    Returns True when this call performed the rebuild.
+    """
+    global _bootstrapped
+    if _bootstrapped:
+        return False
+
+    with _bootstrap_lock:
+        if _bootstrapped:
+            return False
+
+        rebuilt = False
+        meta = stats.find_one({"_id": META_ID}) or {}
+        if meta.get("version") != STATS_VERSION and properties.find_one({}, {"_id": 1}):
+            rebuild_market_stats()
+            rebuilt = True
+        _bootstrapped = True
+        return rebuilt
+
+
+# ---------- READ ----------
+def _avg(bucket):
+    return bucket["sum"] / bucket["priced"] if bucket.get("priced") else None
+
+
+# BSON comparison order of the types a listing field can hold
+_TYPE_RANK = ((type(None), 1), (bool, 8), (int, 2), (float, 2), (str, 3), (dict, 4), (list, 5),
+              (ObjectId, 7), (datetime, 9))
+
+
+def _sort_key(value):
+    """Orders mixed-type values the way a Mongo $sort would (null < numbers < strings < ...)."""
+    for kind, rank in _TYPE_RANK:
+        if isinstance(value, kind):
+            return (rank, value if rank not in (1, 4, 5) else str(value))
+    return (10, str(value))
+
+
+def city_stats(city):
+    _ensure_bootstrapped()
+    bucket = stats.find_one({"_id": _bucket_id({"scope": "city", "city": city})})
+    if not bucket:
+        return []
+
+    return [{
+        "_id": city,
+        "avgPrice": _avg(bucket),
+        "minPrice": bucket.get("min"),
+        "maxPrice": bucket.get("max"),
+        "totalListings": bucket["count"]
+    }]
+
+
+def all_city_stats():
+    _ensure_bootstrapped()
+    rows = [
+        {"_id": b["city"], "avgPrice": _avg(b), "totalListings": b["count"]}
+        for b in stats.find({"scope": "city"})
+    ]
+    return sorted(rows, key=lambda r: _sort_key(r["avgPrice"]))
+
+
+def bedroom_stats():
+    _ensure_bootstrapped()
+    rows = [
+        {
+            "_id": b["bedrooms"],
+            "avgPrice": _avg(b),
+            "minPrice": b.get("min"),
+            "maxPrice": b.get("max"),
+            "count": b["count"]
+        }
+        for b in stats.find({"scope": "bedrooms"})
+    ]
+    return sorted(rows, key=lambda r: _sort_key(r["_id"]))
+
+
+def cheapest_city_segment(city):
+    _ensure_bootstrapped()
+    rows = [
+        {"bedrooms": b["bedrooms"], "avgPrice": _avg(b), "count": b["count"]}
+        for b in stats.find({"scope": "city_bedrooms", "city": city})
+    ]
+    if not rows:
+        return []
+    return [min(rows, key=lambda r: _sort_key(r["avgPrice"]))]
@@ -1,23 +1,118 @@
-from services.db import get_db
+import base64
+import json
+import re
+from services.db import collection
+from services.cache import invalidate_listing
+from config import Config
+from models import market_stats
+from services.property_index import property_index
+from services.fuzzy_index import fuzzy_index
 from datetime import datetime
 from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from utils.metrics import timed
 
 
-db = get_db()
-properties = db.properties
+properties = collection("properties")
 
 
-# Create indexes for performance
-properties.create_index("city")
-properties.create_index("price")
-properties.create_index("bedrooms")
+def ensure_indexes():
+    """Creates the property indexes; run once by `manage.py migrate`."""
+    properties.create_index("city")
 
-# Compound index for common search pattern
-properties.create_index([("city", 1), ("price", 1)])
+    # Sortable fields carry _id as a tie-breaker so keyset pages come straight off the index
+    properties.create_index([("price", 1), ("_id", 1)])
+    properties.create_index([("bedrooms", 1), ("_id", 1)])
+    properties.create_index([("city", 1), ("_id", 1)])
+
+    # Compound index for common search pattern
+    properties.create_index([("city", 1), ("price", 1), ("_id", 1)])
+
+    # Agent searches match on lowercase shadow fields so they stay on the index
+    properties.create_index([("action_lc", 1), ("city_lc", 1), ("bedrooms", 1), ("price", 1)])
+
+
+# Internal search fields kept out of API responses; pass a copy per query,
+# some drivers (mongomock) modify the projection dict they are given
+PUBLIC_PROJECTION = {"city_lc": 0, "action_lc": 0}
+
+# Only fields backed by a (field, _id) index may be used for sorting
+SORTABLE_FIELDS = ("price", "bedrooms", "city")
+
+
+# ---------- SEARCH KEYS ----------
+def normalize_key(value):
+    """Lowercase form stored in the *_lc shadow fields."""
+    if value is None:
+        return None
+    return str(value).strip().lower()
+
+
+def with_search_keys(doc):
+    """Adds the shadow fields derived from any city/action present in `doc`."""
+    if "city" in doc:
+        doc["city_lc"] = normalize_key(doc["city"])
+    if "action" in doc:
+        doc["action_lc"] = normalize_key(doc["action"])
+    return doc
+
+
+def resolve_city_keys(location):
+    """Lowercase catalog cities a user-typed location refers to.
+
+    Aliases and misspellings ("Bengaluru", "Banglore") resolve through the
+    fuzzy index; unknown names are passed through normalized.
+    """
+    return fuzzy_index.city_keys(location) or [normalize_key(location)]
+
+
+def _one_or_in(values):
+    return values[0] if len(values) == 1 else {"$in": values}
+
+
+def agent_search_query(action=None, location=None, bhk=None):
+    """Case-insensitive equality filter served by the (action_lc, city_lc, bedrooms, price) index."""
+    query = {}
+    if action:
+        query["action_lc"] = normalize_key(action)
+    if location:
+        query["city_lc"] = _one_or_in(resolve_city_keys(location))
+    if bhk:
+        try:
+            query["bedrooms"] = int(bhk)
+        except (TypeError, ValueError):
+            pass
+    return query
+
+
+def backfill_search_keys():
+    """Fills the shadow fields on listings written before they existed."""
+    result = properties.update_many(
+        {"$or": [{"city_lc": {"$exists": False}}, {"action_lc": {"$exists": False}}]},
+        [{"$set": {
+            "city_lc": {"$toLower": {"$trim": {"input": {"$ifNull": ["$city", ""]}}}},
+            "action_lc": {"$toLower": {"$trim": {"input": {"$ifNull": ["$action", ""]}}}}
+        }}]
+    )
+    return result.modified_count
+
+
+# ---------- WRITE HOOKS ----------
+def _on_property_change(added=(), removed=()):
+    """Keeps derived data in sync after listings are written."""
+    market_stats.apply_changes(added=added, removed=removed)
+    property_index.apply_changes(added=added, removed=removed)
+    fuzzy_index.apply_changes(added=added, removed=removed)
+
+    touched = {(doc.get("city"), doc.get("action")) for doc in list(added) + list(removed)}
+    for city, action in touched:
+        invalidate_listing(city, action)
 
 
 # ---------- CREATE ----------
-def create_property(data):
+def build_property_doc(data):
+    """Listing document with the field defaults shared by every write path."""
     property_doc = {
         "title": data["title"],
         "price": data["price"],
@@ -29,134 +124,154 @@ def create_property(data):
         "action": data.get("action", "Buy"), # Default to Buy/Sale
         "created_at": datetime.utcnow()
     }
+    return with_search_keys(property_doc)
+
+
+def create_property(data):
+    property_doc = build_property_doc(data)
 
     result = properties.insert_one(property_doc)
+    _on_property_change(added=[property_doc])
     return str(result.inserted_id)
 
 
+def insert_properties(property_docs):
+    """Bulk-inserts prepared listing documents with one unordered insert_many.
+
+    Derived data is updated once for the whole batch. Returns the number of
+    inserted documents and a list of (batch position, error message) for
+    the documents the server rejected.
+    """
+    if not property_docs:
+        return 0, []
+
+    failed = {}
+    try:
+        properties.insert_many(property_docs, ordered=False)
+    except BulkWriteError as e:
+        for err in e.details.get("writeErrors", []):
+            failed[err["index"]] = err.get("errmsg", "Write failed")
+
+    inserted = [doc for i, doc in enumerate(property_docs) if i not in failed]
+    if inserted:
+        _on_property_change(added=inserted)
+
+    return len(inserted), sorted(failed.items())
+
+
 def city_market_stats(city):
-    pipeline = [
-        {"$match": {"city": city}},
-        {
-            "$group": {
-                "_id": "$city",
-                "avgPrice": {"$avg": "$price"},
-                "minPrice": {"$min": "$price"},
-                "maxPrice": {"$max": "$price"},
-                "totalListings": {"$sum": 1}
-            }
-        }
-    ]
+    return market_stats.city_stats(city)
 
-    result = list(properties.aggregate(pipeline))
-    return result
-
-
-def recommend_properties(city, max_price, bedrooms):
-    pipeline = [
-        {
-            "$match": {
-                "city": city,
-                "price": {"$lte": int(max_price)},
-                "bedrooms": int(bedrooms)
-            }
-        },
-        {
-            "$sort": {"price": 1}
-        },
-        {
-            "$limit": 5
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "title": 1,
-                "price": 1,
-                "bedrooms": 1,
-                "city": 1
-            }
-        }
-    ]
 
-    return list(properties.aggregate(pipeline))
+@timed("mongo_nearest")
+def nearest_price_properties(query, target, k=None, projection=None):
+    """Returns the k listings matching `query` whose price is closest to `target`.
 
+    Two index-backed range scans walk outwards from the target, one on each
+    side, so only 2k documents are read no matter how large the match set is.
+    """
+    k = k or Config.NEAREST_PRICE_K
+    target = float(target)
 
-def city_overview():
-    pipeline = [
-        {
-            "$group": {
-                "_id": "$city",
-                "avgPrice": {"$avg": "$price"},
-                "totalListings": {"$sum": 1}
-            }
-        },
-        {
-            "$sort": {"avgPrice": 1}
-        }
-    ]
+    below = list(
+        properties.find({**query, "price": {"$lte": target}}, projection)
+        .sort("price", -1)
+        .limit(k)
+    )
+    above = list(
+        properties.find({**query, "price": {"$gt": target}}, projection)
+        .sort("price", 1)
+        .limit(k)
+    )
 
-    return list(properties.aggregate(pipeline))
+    # Stable sort keeps the cheaper listing first on equal distance
+    return sorted(below + above, key=lambda p: abs(p["price"] - target))[:k]
 
 
-def price_by_bedrooms():
-    pipeline = [
-        {
-            "$group": {
-                "_id": "$bedrooms",
-                "avgPrice": {"$avg": "$price"},
-                "minPrice": {"$min": "$price"},
-                "maxPrice": {"$max": "$price"},
-                "count": {"$sum": 1}
-            }
-        },
-        {
-            "$sort": {"_id": 1}
-        }
+def recommend_properties(city, max_price, bedrooms, k=None):
+    """Cheapest listings within budget, topped up with the closest ones above it."""
+    k = k or Config.RECOMMEND_K
+    query = {"city": city, "bedrooms": int(bedrooms)}
+    projection = {
+        "_id": 0,
+        "title": 1,
+        "price": 1,
+        "bedrooms": 1,
+        "city": 1
+    }
+
+    within = list(
+        properties.find({**query, "price": {"$lte": float(max_price)}}, projection)
+        .sort("price", 1)
+        .limit(k)
+    )
+    if len(within) == k:
+        return within
+
+    # Every in-budget listing is already in `within`; fill up from the nearest above it
+    above = [
+        p for p in nearest_price_properties(query, max_price, k=k, projection=dict(projection))
+        if p["price"] > float(max_price)
     ]
+    return within + above[:k - len(within)]
 
-    return list(properties.aggregate(pipeline))
 
+def city_overview():
+    return market_stats.all_city_stats()
 
-def cheapest_segment(city):
-    pipeline = [
-        {"$match": {"city": city}},
-        {
-            "$group": {
-                "_id": "$bedrooms",
-                "avgPrice": {"$avg": "$price"},
-                "count": {"$sum": 1}
-            }
-        },
-        {"$sort": {"avgPrice": 1}},
-        {"$limit": 1},
-        {
-            "$project": {
-                "_id": 0,
-                "bedrooms": "$_id",
-                "avgPrice": 1,
-                "count": 1
-            }
-        }
-    ]
 
-    return list(properties.aggregate(pipeline))
+def price_by_bedrooms():
+    return market_stats.bedroom_stats()
+
+
+def cheapest_segment(city):
+    return market_stats.cheapest_city_segment(city)
 
 
 # ---------- READ ----------
 def get_property_by_id(pid):
-    prop = properties.find_one({"_id": ObjectId(pid)})
+    prop = properties.find_one({"_id": ObjectId(pid)}, dict(PUBLIC_PROJECTION))
     if prop:
         prop["_id"] = str(prop["_id"])
     return prop
 
 
 # ---------- SEARCH ----------
+def encode_cursor(sort_field, order, last):
+    """Opaque cursor pointing just after `last` in (sort_field, _id) order."""
+    payload = {"s": sort_field, "o": order, "v": last.get(sort_field), "id": str(last["_id"])}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(token, sort_field, order):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        last_id = ObjectId(payload["id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    if payload.get("s") != sort_field or payload.get("o") != order:
+        raise ValueError("Cursor does not match sortBy/order")
+
+    return payload["v"], last_id
+
+
+@timed("property_search")
 def search_properties(filters):
+    """Returns (results, next_cursor) for the given filters.
+
+    Pages are addressed either by `page` (skip/limit) or, for deep pages, by
+    the opaque `cursor` returned from the previous call. A `q` text query
+    ranks listings by title/city relevance instead and is paged by `page`.
+    """
     query = {}
 
     # ---- Filters ----
+    cities = None
     if "city" in filters:
-        query["city"] = filters["city"]
+        # Stored spellings the requested city refers to (aliases, typos)
+        cities = fuzzy_index.city_names(filters["city"]) or [filters["city"]]
+        query["city"] = _one_or_in(cities)
 
     # price range support
     if "minPrice" in filters or "maxPrice" in filters:
@@ -168,43 +283,117 @@ def search_properties(filters):
         if "maxPrice" in filters:
             query["price"]["$lte"] = int(filters["maxPrice"])
 
-    # ---- Pagination ----
-    page = int(filters.get("page", 1))
-    limit = int(filters.get("limit", 5))
-    skip = (page - 1) * limit
+    if filters.get("q"):
+        return _text_search(filters["q"], query, cities, filters)
 
     # ---- Sorting ----
     sort_field = filters.get("sortBy", "price")
     order = filters.get("order", "asc")
 
+    if sort_field not in SORTABLE_FIELDS:
+        raise ValueError(f"sortBy must be one of: {', '.join(SORTABLE_FIELDS)}")
+
     sort_order = 1 if order == "asc" else -1
 
-    cursor = (
-        properties.find(query)
-        .sort(sort_field, sort_order)
-        .skip(skip)
-        .limit(limit)
-    )
+    # ---- Pagination ----
+    limit = int(filters.get("limit", 5))
+
+    if filters.get("cursor"):
+        last_value, last_id = decode_cursor(filters["cursor"], sort_field, order)
+        op = "$gt" if sort_order == 1 else "$lt"
+        keyset = {"$or": [
+            {sort_field: {op: last_value}},
+            {sort_field: last_value, "_id": {op: last_id}}
+        ]}
+        query = {"$and": [query, keyset]} if query else keyset
+        skip = 0
+    else:
+        page = int(filters.get("page", 1))
+        skip = (page - 1) * limit
+
+    docs = None
+    if not filters.get("cursor"):
+        # Page through the in-memory index when it can answer the query
+        ids = property_index.search(
+            sort_field=sort_field,
+            order=sort_order,
+            skip=skip,
+            limit=limit,
+            city=cities,
+            min_price=filters.get("minPrice"),
+            max_price=filters.get("maxPrice")
+        )
+        if ids is not None:
+            by_id = {p["_id"]: p for p in properties.find({"_id": {"$in": ids}}, dict(PUBLIC_PROJECTION))}
+            docs = [by_id[i] for i in ids if i in by_id]
+
+    if docs is None:
+        docs = list(
+            properties.find(query, dict(PUBLIC_PROJECTION))
+            .sort([(sort_field, sort_order), ("_id", sort_order)])
+            .skip(skip)
+            .limit(limit)
+        )
 
     # ---- Formatting ----
+    next_cursor = encode_cursor(sort_field, order, docs[-1]) if docs and len(docs) == limit else None
+
     results = []
-    for p in cursor:
+    for p in docs:
         p["_id"] = str(p["_id"])
         results.append(p)
 
-    return results
+    return results, next_cursor
+
+
+def _text_search(text, query, cities, filters):
+    """One page of listings ranked by the fuzzy index, with the other filters applied in Mongo."""
+    if filters.get("cursor"):
+        raise ValueError("cursor paging is not supported with q; use page")
+
+    limit = int(filters.get("limit", 5))
+    skip = (int(filters.get("page", 1)) - 1) * limit
+
+    city_keys = [c.lower() for c in cities] if cities else None
+    ranked = fuzzy_index.search(text, city_keys=city_keys, limit=Config.FUZZY_SEARCH_LIMIT)
+    if ranked is None:
+        # Index not built yet: plain substring match on the title
+        query["title"] = {"$regex": re.escape(text.strip()), "$options": "i"}
+        docs = list(properties.find(query, dict(PUBLIC_PROJECTION)).sort([("_id", 1)]).skip(skip).limit(limit))
+    else:
+        query["_id"] = {"$in": ranked}
+        by_id = {p["_id"]: p for p in properties.find(query, dict(PUBLIC_PROJECTION))}
+        docs = [by_id[i] for i in ranked if i in by_id][skip:skip + limit]
+
+    for p in docs:
+        p["_id"] = str(p["_id"])
+    return docs, None
 
 
 # ---------- UPDATE ----------
 def update_property(pid, updates):
-    result = properties.update_one(
+    updates = with_search_keys(dict(updates))
+    before = properties.find_one_and_update(
         {"_id": ObjectId(pid)},
-        {"$set": updates}
+        {"$set": updates},
+        return_document=ReturnDocument.BEFORE
     )
 
-    return result.modified_count
+    if not before:
+        return 0
+
+    # Same semantics as update_one's modified_count
+    if all(before.get(k) == v for k, v in updates.items()):
+        return 0
+
+    after = {**before, **updates}
+    _on_property_change(added=[after], removed=[before])
+    return 1
 
 
 # ---------- DELETE ----------
 def delete_property(pid):
-    return properties.delete_one({"_id": ObjectId(pid)})
+    deleted = properties.find_one_and_delete({"_id": ObjectId(pid)})
+    if deleted:
+        _on_property_change(removed=[deleted])
+    return deleted
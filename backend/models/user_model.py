@@ -1,24 +1,59 @@
-from services.db import get_db
+from services.db import collection
+from services.cache import MemoryBackend
 from datetime import datetime
-import bcrypt
+from pymongo.errors import DuplicateKeyError
+from config import Config
+from utils.security import password_hasher
+
+users = collection("users")
+
+# Fields returned to clients; the password hash is only ever read by login
+PROFILE_PROJECTION = {
+    "name": 1,
+    "email": 1,
+    "phone": 1,
+    "city": 1,
+    "role": 1,
+    "created_at": 1
+}
+
+# Profiles change rarely, so refresh and /auth/user can serve them from memory briefly
+profile_cache = MemoryBackend(max_entries=Config.USER_CACHE_MAX_ENTRIES, ttl=Config.USER_CACHE_TTL)
+
+
+def ensure_indexes():
+    # create_user relies on this index to reject duplicate emails
+    users.create_index("email", unique=True)
 
-db = get_db()
-users = db.users
-users.create_index("email", unique=True)
 
 def hash_password(password: str) -> bytes:
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode(), salt)
+    return password_hasher.hash(password)
 
 
-def create_user(data):
-    db = get_db()
-    users = db.users
+def _to_profile(user):
+    profile = {field: user[field] for field in PROFILE_PROJECTION if field in user}
+    profile["_id"] = str(user["_id"])
+    return profile
 
-    # Prevent duplicate email
-    if users.find_one({"email": data["email"]}):
-        raise Exception("Email already registered")
 
+# ---------- Repository ----------
+
+def find_user_for_login(email):
+    """Returns (password hash, profile) from one projected query, or (None, None)."""
+    user = users.find_one(
+        {"email": email},
+        {"password": 1, **PROFILE_PROJECTION}
+    )
+
+    if not user:
+        return None, None
+
+    profile = _to_profile(user)
+    profile_cache.set(email, profile)
+    return user["password"], profile
+
+
+def create_user(data):
     hashed_pw = hash_password(data["password"])
 
     user = {
@@ -31,34 +66,50 @@ def create_user(data):
         "created_at": datetime.utcnow()
     }
 
-    result = users.insert_one(user)
+    # The unique index on email rejects duplicates; no need to look first
+    try:
+        result = users.insert_one(user)
+    except DuplicateKeyError:
+        raise Exception("Email already registered")
+
+    profile_cache.delete(data["email"])
     return str(result.inserted_id)
 
 
 def get_user_by_email(email):
-    db = get_db()
-    users = db.users
+    profile = profile_cache.get(email)
+    if profile is not None:
+        return dict(profile)
 
-    user = users.find_one({"email": email})
+    user = users.find_one({"email": email}, PROFILE_PROJECTION)
 
-    if user:
-        user["_id"] = str(user["_id"])
-        user.pop("password", None)  # hide password
+    if not user:
+        return None
 
-    return user
+    profile = _to_profile(user)
+    profile_cache.set(email, profile)
+    return dict(profile)
 
-def verify_password(email, password):
-    db = get_db()
-    users = db.users
 
-    user = users.find_one({"email": email})
+def authenticate(email, password):
+    """Checks the password and returns the user's profile, or None."""
+    stored_hash, profile = find_user_for_login(email)
 
-    if not user:
-        return False
+    if stored_hash is None:
+        return None
+
+    if not password_hasher.verify(password, stored_hash):
+        return None
 
-    stored_hash = user["password"]
+    # Upgrade hashes made with a different cost factor while we know the password
+    if password_hasher.needs_rehash(stored_hash):
+        users.update_one(
+            {"email": email, "password": stored_hash},
+            {"$set": {"password": hash_password(password)}}
+        )
 
-    if bcrypt.checkpw(password.encode(), stored_hash):
-        return True
+    return dict(profile)
 
-    return False
+
+def verify_password(email, password):
+    return authenticate(email, password) is not None
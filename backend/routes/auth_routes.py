@@ -1,16 +1,26 @@
+import logging
 from flask import Blueprint, request
 import random
 from datetime import datetime
 import jwt
 from config import Config
-from models.user_model import create_user, get_user_by_email, verify_password, hash_password
+from models.user_model import create_user, get_user_by_email, authenticate, hash_password
 from utils.token_utils import generate_access_token, generate_refresh_token
 from utils.validators import require_fields, valid_email, valid_password
 from services.db import get_db
-from services.email_service import send_otp_email
+from services.email_service import enqueue_otp_email
+from utils.security import HashingBusyError
+
+logger = logging.getLogger(__name__)
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
+
+@auth_bp.errorhandler(HashingBusyError)
+def hashing_busy(e):
+    """Password hashing pool is saturated; ask the client to retry shortly."""
+    return {"error": "Server busy, please retry"}, 503, {"Retry-After": "1"}
+
 @auth_bp.route("/register", methods=["POST"])
 def register():
     """Handles new user registration with enriched details."""
@@ -39,6 +49,9 @@ def register():
             "data": {"user_id": user_id}
         }, 201
 
+    except HashingBusyError:
+        raise
+
     except Exception as e:
         return {
             "success": False,
@@ -53,9 +66,10 @@ def login():
     if not data or not data.get("email") or not data.get("password"):
         return {"error": "Email and password required"}, 400
 
-    if verify_password(data["email"], data["password"]):
+    # One query fetches both the hash and the profile used for the tokens
+    user = authenticate(data["email"], data["password"])
 
-        user = get_user_by_email(data["email"])
+    if user:
 
         access_token = generate_access_token(
             user["email"],
@@ -135,13 +149,15 @@ def forgot_password():
         upsert=True
     )
     
-    print(f"\n--- DEBUG OTP ---\nTarget: {email}\nCode: {otp}\n-----------------\n")
+    # Only visible with LOG_LEVEL=DEBUG (local development without SMTP)
+    logger.debug("Password reset OTP %s", otp, extra={"email": email})
 
-    success = send_otp_email(email, otp)
+    # Delivery happens on the email worker pool; don't hold the request open
+    success = enqueue_otp_email(email, otp)
     if success:
         return {"message": "OTP has been sent to your email."}, 200
     else:
-        return {"message": "Email sending failed. (Check backend terminal for OTP)"}, 200
+        return {"message": "Could not send the reset email right now. Please try again in a few minutes."}, 200
 
 @auth_bp.route("/verify-otp", methods=["POST"])
 def verify_otp():
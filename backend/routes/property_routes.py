@@ -1,3 +1,4 @@
+import io
 from flask import Blueprint, request
 from utils.auth_middleware import token_required
 from utils.role_required import role_required
@@ -13,6 +14,7 @@ from models.property_model import (
     price_by_bedrooms,
     cheapest_segment
 )
+from services.property_import import detect_format, iter_rows, import_listings
 
 property_bp = Blueprint("property", __name__, url_prefix="/properties")
 
@@ -28,6 +30,30 @@ def add_property():
     return {"success": True, "id": pid}, 201
 
 
+# BULK IMPORT
+@property_bp.route("/import", methods=["POST"])
+@token_required
+@role_required("seller", "admin")
+def import_properties():
+    """Streams a CSV/JSONL listing feed (multipart "file" or raw body) into batched inserts."""
+    upload = request.files.get("file")
+    if upload:
+        stream = upload.stream
+        fmt = request.args.get("format") or detect_format(upload.filename, upload.mimetype)
+    else:
+        stream = request.stream
+        fmt = request.args.get("format") or detect_format(content_type=request.content_type)
+
+    if fmt not in ("csv", "jsonl"):
+        return {"error": "Unsupported format; use csv or jsonl"}, 400
+
+    batch_size = request.args.get("batch_size", type=int)
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    report = import_listings(iter_rows(text, fmt), batch_size=batch_size, listed_by=request.user["email"])
+
+    return {"success": report["failed"] == 0, **report}, 200
+
+
 # READ
 @property_bp.route("/<pid>", methods=["GET"])
 def get_property(pid):
@@ -41,8 +67,13 @@ def get_property(pid):
 @property_bp.route("/search", methods=["GET"])
 def search():
     filters = request.args
-    results = search_properties(filters)
-    return {"results": results}
+
+    try:
+        results, next_cursor = search_properties(filters)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    return {"results": results, "next_cursor": next_cursor}
 
 
 # DELETE
@@ -94,8 +125,9 @@ def recommend():
     city = request.args.get("city")
     max_price = request.args.get("max_price")
     bedrooms = request.args.get("bedrooms")
+    k = request.args.get("k", type=int)
 
-    results = recommend_properties(city, max_price, bedrooms)
+    results = recommend_properties(city, max_price, bedrooms, k=k)
 
     return {"recommendations": results}
 
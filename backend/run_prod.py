@@ -1,8 +1,25 @@
-from app import app
 from waitress import serve
+import logging
 import os
+import signal
+import sys
 
 if __name__ == "__main__":
+    # Imported here, not at module level: password-hashing pool processes
+    # re-import this file and must not build their own copy of the app
+    from app import app
+    from config import Config
+
+    if Config.MIGRATE_ON_START:
+        from services.migrations import run_migrations
+        run_migrations()
+
     port = int(os.environ.get("PORT", 5016))
-    print(f"Starting production server on http://localhost:{port}")
-    serve(app, host="0.0.0.0", port=port)
+    # Streaming chat responses hold a thread for their whole duration
+    threads = int(os.environ.get("WAITRESS_THREADS", 8))
+
+    # Exit cleanly on SIGTERM (docker/k8s stop) so atexit flushes queued writes
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    logging.getLogger(__name__).info("Starting production server on http://localhost:%d", port)
+    serve(app, host="0.0.0.0", port=port, threads=threads)
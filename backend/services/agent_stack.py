@@ -0,0 +1,66 @@
+import os
+from typing import Optional
+from crewai import LLM
+from crewai.tools import BaseTool
+from services.concierge import ConciergePipelinePool, build_concierge_crew
+from services.llm import CHAT_MODEL, search_properties, capture_tool_result
+from services.prompt_builder import count_tokens
+from services.rate_limiter import llm_scheduler, llm_user
+from config import Config
+
+# Everything that needs CrewAI lives here. services.llm imports this module on
+# the first agent request (or from warm_agent_stack), so workers that only
+# serve /auth and /properties never load the agent stack.
+
+
+class SearchPropertiesTool(BaseTool):
+    name: str = "search_properties"
+    description: str = "Search for properties based on user requirements (Buy/Rent, Location, BHK, Max Price, Property ID)."
+
+    def _run(self, action: Optional[str] = None, location: Optional[str] = None, bhk: Optional[int] = None, max_price: Optional[float] = None, property_id: Optional[str] = None) -> str:
+        output = search_properties(
+            action=action,
+            location=location,
+            bhk=bhk,
+            max_price=max_price,
+            property_id=property_id
+        )
+        # Hand the typed results to the chat request alongside the text the agent sees
+        capture_tool_result(output)
+        return output
+
+class ScheduledLLM(LLM):
+    """CrewAI LLM whose calls wait for the shared RPM/TPM scheduler and retry 429s."""
+
+    def call(self, messages, *args, **kwargs):
+        if isinstance(messages, str):
+            text = messages
+        else:
+            text = "\n".join(str(m.get("content", "")) for m in messages)
+        tokens = count_tokens(text) + Config.LLM_COMPLETION_TOKENS
+
+        return llm_scheduler.run(
+            llm_user.get(),
+            tokens,
+            lambda: super(ScheduledLLM, self).call(messages, *args, **kwargs)
+        )
+
+# LLM Setup - Using 8B model for higher rate limits on free tier
+# Ensure CrewAI sees the API key in the environment
+groq_key = os.getenv("GROQ_API_KEY")
+
+if groq_key:
+    os.environ["GROQ_API_KEY"] = groq_key
+
+# Explicitly use the Groq provider via LiteLLM prefix
+llm = ScheduledLLM(
+    model=CHAT_MODEL,
+    temperature=0,
+    base_url=Config.LLM_BASE_URL
+)
+
+# Warm agent/task/crew pipelines, leased per request
+pipeline_pool = ConciergePipelinePool(
+    lambda: build_concierge_crew(llm, [SearchPropertiesTool()]),
+    size=Config.CREW_POOL_SIZE
+)
@@ -0,0 +1,210 @@
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+from services.db import collection
+from services.fuzzy_index import fuzzy_index
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """In-process LRU cache with per-entry TTL, safe to share across threads."""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires_at, tag, value)
+        self._tags = {}                 # tag -> set of keys
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, tag, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, tag=None):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic() + self.ttl, tag, value)
+            if tag is not None:
+                self._tags.setdefault(tag, set()).add(key)
+
+            # Evict least recently used entries beyond the cap
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate(self, tag):
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key):
+        _, tag, _ = self._entries.pop(key)
+        keys = self._tags.get(tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+
+class MongoBackend:
+    """Shared cache stored in MongoDB so every worker sees the same entries.
+
+    Expiry is handled by a TTL index; entries are also checked on read
+    because the TTL monitor only runs about once a minute.
+    """
+
+    def __init__(self, collection_name="response_cache", ttl=300):
+        self.ttl = ttl
+        self.collection = collection(collection_name)
+
+    def ensure_indexes(self):
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+        self.collection.create_index("tag")
+
+    def get(self, key):
+        doc = self.collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+            {"value": 1}
+        )
+        return doc["value"] if doc else None
+
+    def set(self, key, value, tag=None):
+        self.collection.update_one(
+            {"_id": key},
+            {"$set": {
+                "value": value,
+                "tag": tag,
+                "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)
+            }},
+            upsert=True
+        )
+
+    def invalidate(self, tag):
+        self.collection.delete_many({"tag": tag})
+
+    def clear(self):
+        self.collection.delete_many({})
+
+
+class ResponseCache:
+    """Wraps a cache backend with hit/miss counters.
+
+    Backend errors are treated as misses so a cache outage never fails a request.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    def get(self, key):
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.error("Cache read error: %s", e)
+            value = None
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value, tag=None):
+        try:
+            self.backend.set(key, value, tag)
+        except Exception as e:
+            logger.error("Cache write error: %s", e)
+
+    def invalidate(self, tag):
+        try:
+            self.backend.invalidate(tag)
+        except Exception as e:
+            logger.error("Cache invalidation error: %s", e)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0
+            }
+
+
+def listing_tag(city, action):
+    """Cache tag shared by every answer about one city/action pair.
+
+    Cities are tagged by their canonical name, so a listing stored as
+    "Bengaluru" invalidates answers about "Bangalore": searches cover every
+    spelling of a city (see property_model.resolve_city_keys).
+    """
+    if not city or not action:
+        return None
+    return f"{str(action).strip().lower()}|{fuzzy_index.canonical_city(city)}"
+
+
+def budget_key(budget):
+    """Exact parsed budget; the reply text and the price cap both depend on it."""
+    if not budget:
+        return None
+    return float(budget)
+
+
+def chat_cache_key(slots):
+    """Normalised (action, city, bhk, budget) key for a chat message."""
+    if slots.get("action") not in ("Buy", "Rent") or not slots.get("city"):
+        return None
+    # "chat4": fast-path replies keyed by exact budget (older prefixes rounded it
+    # or held agent replies)
+    return "chat4:" + "|".join(str(part) for part in (
+        slots["action"].lower(),
+        slots["city"].strip().lower(),
+        slots.get("bhk"),
+        budget_key(slots.get("budget"))
+    ))
+
+
+def _build_backend():
+    if Config.CHAT_CACHE_BACKEND == "mongo":
+        return MongoBackend(ttl=Config.CHAT_CACHE_TTL)
+    return MemoryBackend(max_entries=Config.CHAT_CACHE_MAX_ENTRIES, ttl=Config.CHAT_CACHE_TTL)
+
+
+response_cache = ResponseCache(_build_backend())
+
+
+def invalidate_listing(city, action):
+    """Drops cached answers that could include a listing in this city/action."""
+    tag = listing_tag(city, action)
+    if tag:
+        response_cache.invalidate(tag)
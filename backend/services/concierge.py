@@ -0,0 +1,127 @@
+import queue
+from contextlib import contextmanager
+from threading import Lock
+from utils.metrics import span
+
+
+# Sent with every agent call; kept unindented since every space costs tokens
+CONCIERGE_BACKSTORY = """You are a helpful and conversational real estate concierge.
+Rules:
+1. Be conversational and polite.
+2. Do NOT assume a location, budget, or other details unless explicitly stated by the user. If missing, ASK clarifying questions politely.
+3. Ask ONE question at a time.
+4. When you have enough info, use the search tool.
+5. NO property text/bullets. Output ONLY JSON for results when the search tool returns properties.
+6. Ignore stale city/action if the user changes the topic."""
+
+# Filled in by crew.kickoff(inputs=...) on every request
+TASK_TEMPLATE = "Msg: '{message}' | History: {history}\nRules: if 'MANDATORY_JSON_RESULTS' found, use ONLY JSON block. No descriptions."
+
+
+# CrewAI is imported inside the builders so importing this module stays cheap
+
+def build_concierge_agent(llm, tools):
+    from crewai import Agent
+
+    return Agent(
+        role="Real Estate Concierge",
+        goal="Help users find property.",
+        backstory=CONCIERGE_BACKSTORY,
+        verbose=False,
+        allow_delegation=False,
+        llm=llm,
+        tools=tools,
+        # Request rate is limited for all crews by services.rate_limiter
+        max_iter=2,
+        # Tool results must not be reused across requests; see build_concierge_crew
+        cache=False
+    )
+
+
+def build_concierge_crew(llm, tools):
+    """Builds one reusable agent/task/crew pipeline with a templated task."""
+    from crewai import Task, Crew, Process
+
+    agent = build_concierge_agent(llm, tools)
+
+    task = Task(
+        description=TASK_TEMPLATE,
+        expected_output="Text + JSON block.",
+        agent=agent
+    )
+
+    # Pooled crews outlive requests: CrewAI's tool-result cache would keep
+    # serving old search results (past listing changes) and skip the tool,
+    # which is what records the out-of-band listings for the route
+    return Crew(
+        agents=[agent],
+        tasks=[task],
+        process=Process.sequential,
+        cache=False
+    )
+
+
+class ConciergePipelinePool:
+    """Thread-safe pool of warm concierge crews.
+
+    Crews are not safe to kick off concurrently, so each request leases one
+    exclusively. Crews are built lazily up to `size`; once all are leased,
+    callers wait up to `timeout` seconds for one to be returned.
+    """
+
+    def __init__(self, factory, size=4, timeout=30):
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                build = True
+            else:
+                build = False
+
+        if build:
+            try:
+                return self.factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError("No concierge pipeline available")
+
+    @contextmanager
+    def lease(self):
+        crew = self._acquire()
+        try:
+            yield crew
+        finally:
+            self._idle.put(crew)
+
+    def warm(self, count=1):
+        """Pre-builds crews so the first requests skip construction."""
+        crews = [self._acquire() for _ in range(min(count, self.size))]
+        for crew in crews:
+            self._idle.put(crew)
+
+    def kickoff(self, message, history):
+        # Leasing includes building a crew when none is idle yet
+        with span("crew_setup"):
+            crew = self._acquire()
+        try:
+            return crew.kickoff(inputs={"message": message, "history": history})
+        finally:
+            self._idle.put(crew)
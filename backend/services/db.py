@@ -1,13 +1,64 @@
+import os
+import threading
 from pymongo import MongoClient
 from config import Config
 import certifi
 
-client = MongoClient(
-    Config.MONGO_URI,
-    tlsCAFile=certifi.where()
-)
+_client = None
+_db = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def _client_options():
+    options = {
+        "tlsCAFile": certifi.where(),
+        "maxPoolSize": Config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": Config.MONGO_MIN_POOL_SIZE,
+        "readPreference": Config.MONGO_READ_PREFERENCE
+    }
+    if Config.MONGO_WAIT_QUEUE_TIMEOUT_MS:
+        options["waitQueueTimeoutMS"] = Config.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if Config.MONGO_COMPRESSORS:
+        options["compressors"] = Config.MONGO_COMPRESSORS
+    return options
+
+
+def get_client():
+    """Returns this process's MongoClient, creating it on first use.
+
+    A forked worker builds its own client instead of reusing the parent's
+    sockets and monitor threads, which are not fork-safe.
+    """
+    global _client, _db, _client_pid
+
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = MongoClient(Config.MONGO_URI, **_client_options())
+                _db = _client[Config.DB_NAME]
+                _client_pid = os.getpid()
+    return _client
 
-db = client[Config.DB_NAME]
 
 def get_db():
-    return db
+    get_client()
+    return _db
+
+
+class LazyCollection:
+    """Module-level collection handle that resolves the client on each use.
+
+    Lets models keep `properties = collection("properties")` globals without
+    connecting at import time or pinning a client across a fork.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_db()[self.name], attr)
+
+
+def collection(name):
+    return LazyCollection(name)
@@ -1,12 +1,20 @@
+import logging
 import os
+import queue
+import random
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
-def send_otp_email(email: str, otp: str):
+
+def build_otp_message(email: str, otp: str):
     msg = MIMEMultipart()
     msg['From'] = os.getenv("MAIL_FROM")
     msg['To'] = email
@@ -26,14 +34,203 @@ def send_otp_email(email: str, otp: str):
     Haven AI Team
     """
     msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+
+class SMTPConnectionPool:
+    """Small pool of connected, authenticated SMTP sessions.
+
+    At most `size` connections are open at once; callers beyond that wait up
+    to `timeout` seconds for one to be released or discarded. Every idle
+    connection is checked with NOOP before reuse. STARTTLS and login are
+    skipped when MAIL_USE_TLS=false / no MAIL_USERNAME, which is what a local
+    aiosmtpd-style test server expects.
+    """
+
+    def __init__(self, size=2, timeout=30):
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._open = 0
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        server = smtplib.SMTP(
+            os.getenv("MAIL_SERVER"),
+            int(os.getenv("MAIL_PORT", 587)),
+            timeout=int(os.getenv("MAIL_TIMEOUT", 10))
+        )
+        if os.getenv("MAIL_USE_TLS", "true").lower() == "true":
+            server.starttls()
+        if os.getenv("MAIL_USERNAME"):
+            server.login(os.getenv("MAIL_USERNAME"), os.getenv("MAIL_PASSWORD"))
+        return server
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                # Wait for an idle connection or a free slot to open one
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        raise TimeoutError("No SMTP connection became available")
+                if self._idle:
+                    server = self._idle.pop()
+                else:
+                    server = None
+                    self._open += 1
+
+            if server is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard(server)
+
+    def release(self, server, broken=False):
+        if broken:
+            self._discard(server)
+            return
+        with self._cond:
+            self._idle.append(server)
+            self._cond.notify()
+
+    def _discard(self, server):
+        # Frees the slot so a waiter can open a fresh connection
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+
+smtp_pool = SMTPConnectionPool(
+    size=int(os.getenv("MAIL_POOL_SIZE", 2)),
+    timeout=int(os.getenv("MAIL_POOL_TIMEOUT", 30))
+)
+
+
+class EmailQueue:
+    """Background delivery of outgoing mail with retries and batching.
+
+    Worker threads take up to `batch_size` queued messages at a time and
+    send them over one pooled connection. A failed message is retried with
+    jittered exponential backoff, up to `max_retries` times.
+    """
+
+    def __init__(self, workers=2, batch_size=10, max_retries=3, backoff=2.0, max_queue=1000):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._lock = threading.Lock()
+        self.counters = {"sent": 0, "retried": 0, "failed": 0}
+
+    def _ensure_workers(self):
+        with self._lock:
+            if any(t.is_alive() for t in self._threads):
+                return
+            self._threads = [
+                threading.Thread(target=self._run, name=f"email-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for t in self._threads:
+                t.start()
+
+    def enqueue(self, msg):
+        """Queues a message; returns False when the queue is full."""
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((msg, 0))
+            return True
+        except queue.Full:
+            return False
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                server = smtp_pool.acquire()
+            except Exception as e:
+                logger.error("Error connecting to mail server: %s", e)
+                for job in batch:
+                    self._retry(job)
+                continue
+
+            broken = False
+            for msg, attempt in batch:
+                if broken:
+                    self._retry((msg, attempt))
+                    continue
+                try:
+                    server.send_message(msg)
+                    self._count("sent")
+                except smtplib.SMTPRecipientsRefused as e:
+                    logger.warning("Error sending email to %s: %s", msg["To"], e)
+                    self._count("failed")
+                except Exception as e:
+                    logger.warning("Error sending email to %s: %s", msg["To"], e)
+                    broken = True
+                    self._retry((msg, attempt))
+            smtp_pool.release(server, broken=broken)
+
+    def _retry(self, job):
+        msg, attempt = job
+        if attempt >= self.max_retries:
+            self._count("failed")
+            logger.error("Giving up on email to %s after %d attempts", msg["To"], attempt + 1)
+            return
+
+        self._count("retried")
+        delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+        timer = threading.Timer(delay, self._requeue, args=((msg, attempt + 1),))
+        timer.daemon = True
+        timer.start()
+
+    def _requeue(self, job):
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._count("failed")
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return {"queue_depth": self._queue.qsize(), **self.counters}
+
+
+email_queue = EmailQueue(
+    workers=int(os.getenv("MAIL_WORKERS", 2)),
+    max_retries=int(os.getenv("MAIL_MAX_RETRIES", 3))
+)
+
 
-    try:
-        server = smtplib.SMTP(os.getenv("MAIL_SERVER"), int(os.getenv("MAIL_PORT", 587)))
-        server.starttls()
-        server.login(os.getenv("MAIL_USERNAME"), os.getenv("MAIL_PASSWORD"))
-        server.send_message(msg)
-        server.quit()
-        return True
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
+def enqueue_otp_email(email: str, otp: str):
+    """Queues the OTP email for background delivery."""
+    return email_queue.enqueue(build_otp_message(email, otp))
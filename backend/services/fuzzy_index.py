@@ -0,0 +1,412 @@
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from services.db import get_db
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+# Alternate and old city names -> the spelling they are matched as.
+# Both sides are compared after normalize(); extend with CITY_ALIASES.
+DEFAULT_CITY_ALIASES = {
+    "bengaluru": "bangalore",
+    "gurugram": "gurgaon",
+    "bombay": "mumbai",
+    "madras": "chennai",
+    "calcutta": "kolkata",
+    "new delhi": "delhi",
+    "poona": "pune",
+    "mysuru": "mysore",
+    "vizag": "visakhapatnam",
+    "trivandrum": "thiruvananthapuram",
+    "cochin": "kochi",
+    "baroda": "vadodara",
+    "mangaluru": "mangalore",
+    "belagavi": "belgaum",
+    "prayagraj": "allahabad",
+}
+
+# Words after which a misspelled word in free text is read as a place ("in banglore")
+LOCATION_WORDS = {"in", "at", "near"}
+
+# Words too common in queries and titles to help ranking
+STOP_WORDS = {"a", "an", "and", "at", "for", "in", "near", "of", "on", "the", "to", "with"}
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def _parse_aliases(value):
+    """"alias=city,alias2=city2" -> {alias: city}."""
+    aliases = {}
+    for pair in (value or "").split(","):
+        if "=" in pair:
+            alias, city = pair.split("=", 1)
+            if normalize(alias) and normalize(city):
+                aliases[normalize(alias)] = normalize(city)
+    return aliases
+
+
+def normalize(text):
+    """Lowercase ASCII words separated by single spaces ("Bengaluru," -> "bengaluru")."""
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode()
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def allowed_edits(word):
+    """Typos tolerated for a word: none for short words, then one, then two."""
+    if len(word) < 5:
+        return 0
+    return 1 if len(word) < 8 else 2
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance, or limit + 1 as soon as it must exceed `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class _Vocabulary:
+    """Words with a trigram index for typo-tolerant lookup."""
+
+    def __init__(self):
+        self.grams = defaultdict(set)
+
+    def add(self, word):
+        for gram in trigrams(word):
+            self.grams[gram].add(word)
+
+    def remove(self, word):
+        for gram in trigrams(word):
+            words = self.grams.get(gram)
+            if words is not None:
+                words.discard(word)
+                if not words:
+                    del self.grams[gram]
+
+    def similar(self, word, known):
+        """[(candidate, edits)] for words in `known` within allowed_edits(word)."""
+        if word in known:
+            return [(word, 0)]
+        limit = allowed_edits(word)
+        if not limit:
+            return []
+
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.grams.get(gram, ()))
+
+        # Each edit touches at most three trigrams
+        needed = len(grams) - 3 * limit
+        matches = []
+        for candidate, count in shared.items():
+            if count >= needed:
+                edits = edit_distance(word, candidate, limit)
+                if edits <= limit:
+                    matches.append((candidate, edits))
+        return matches
+
+
+class FuzzyIndex:
+    """In-process text index over listing titles and cities.
+
+    Cities are matched through an alias table (Bengaluru -> Bangalore) and
+    trigram candidates checked by edit distance, so misspelled or renamed
+    cities resolve to the spellings actually stored in the catalog. Title
+    and city words are indexed per listing for ranked, typo-tolerant text
+    search (IDF-weighted, discounted per typo). Kept in sync by the
+    property write hooks and rebuilt once older than FUZZY_INDEX_MAX_AGE to
+    pick up writes from other processes. Lookups return None until the first
+    build finishes; callers then use the input as given.
+    """
+
+    def __init__(self, max_age=300, aliases=None):
+        self.max_age = max_age
+        self.aliases = {**DEFAULT_CITY_ALIASES, **(aliases or {})}
+        self.ready = False
+        self.built_at = 0.0
+        self._lock = threading.Lock()
+        self._building = False
+        self._reset()
+
+    def _reset(self):
+        # Cities: canonical key -> {city_lc: Counter(display spelling)}
+        self._cities = defaultdict(dict)
+        self._city_vocab = _Vocabulary()
+        # Listings: word -> ids, id -> (city as stored, words)
+        self._postings = defaultdict(set)
+        self._docs = {}
+        self._word_vocab = _Vocabulary()
+
+    def canonical_city(self, name):
+        key = normalize(name)
+        return self.aliases.get(key, key)
+
+    # ---------- MAINTENANCE ----------
+    def _words(self, doc):
+        words = set(normalize(doc.get("title")).split())
+        words.update(self.canonical_city(doc.get("city")).split())
+        return {w for w in words if w and w not in STOP_WORDS}
+
+    def _add(self, doc):
+        self._remove(doc["_id"])
+        city = doc.get("city")
+        if isinstance(city, str) and city.strip():
+            key = self.canonical_city(city)
+            spellings = self._cities[key]
+            if not spellings:
+                self._city_vocab.add(key)
+            spellings.setdefault(city.strip().lower(), Counter())[city.strip()] += 1
+        else:
+            city = None
+
+        words = self._words(doc)
+        for word in words:
+            if not self._postings[word]:
+                self._word_vocab.add(word)
+            self._postings[word].add(doc["_id"])
+        self._docs[doc["_id"]] = (city.strip() if city else None, words)
+
+    def _remove(self, doc_id):
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return
+        city, words = entry
+
+        if city:
+            key = self.canonical_city(city)
+            spellings = self._cities.get(key, {})
+            counts = spellings.get(city.lower())
+            if counts is not None:
+                counts[city] -= 1
+                if counts[city] <= 0:
+                    del counts[city]
+                if not counts:
+                    del spellings[city.lower()]
+            if not spellings:
+                self._cities.pop(key, None)
+                self._city_vocab.remove(key)
+
+        for word in words:
+            ids = self._postings.get(word)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._postings[word]
+                    self._word_vocab.remove(word)
+
+    def build(self):
+        """Loads the index from Mongo and swaps it in atomically."""
+        fresh = FuzzyIndex(self.max_age, self.aliases)
+        for doc in get_db().properties.find({}, {"title": 1, "city": 1}):
+            fresh._add(doc)
+
+        with self._lock:
+            self._cities, self._city_vocab = fresh._cities, fresh._city_vocab
+            self._postings, self._docs, self._word_vocab = fresh._postings, fresh._docs, fresh._word_vocab
+            self.built_at = time.time()
+            self.ready = True
+
+        logger.info("Fuzzy search index built with %d listings and %d cities", len(fresh._docs), len(fresh._cities))
+
+    def build_async(self):
+        """Builds (or rebuilds) the index on a background thread."""
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+
+        def run():
+            try:
+                self.build()
+            except Exception as e:
+                logger.error("Error building fuzzy search index: %s", e)
+            finally:
+                self._building = False
+
+        threading.Thread(target=run, name="fuzzy-index-build", daemon=True).start()
+
+    def apply_changes(self, added=(), removed=()):
+        """Write hook: mirrors listing inserts, updates and deletes."""
+        if not self.ready:
+            return
+        with self._lock:
+            for doc in removed:
+                self._remove(doc["_id"])
+            for doc in added:
+                self._add(doc)
+
+    def _check_ready(self):
+        if not self.ready:
+            return False
+        if time.time() - self.built_at > self.max_age:
+            self.build_async()
+        return True
+
+    # ---------- CITIES ----------
+    def _match_city_key(self, name, fuzzy=True):
+        """Best canonical city key for `name`, exact/alias first, then fewest edits."""
+        key = self.canonical_city(name)
+        if not key:
+            return None
+        if not fuzzy:
+            return key if key in self._cities else None
+        matches = self._city_vocab.similar(key, self._cities)
+        if not matches:
+            return None
+        # Fewest edits, then the city with the most listings
+        best, _ = min(matches, key=lambda m: (m[1], -self._listing_count(m[0])))
+        return best
+
+    def _listing_count(self, key):
+        return sum(sum(c.values()) for c in self._cities.get(key, {}).values())
+
+    def city_keys(self, name):
+        """Lowercase catalog cities `name` refers to, or None if unknown / not built."""
+        if not self._check_ready():
+            return None
+        with self._lock:
+            key = self._match_city_key(name)
+            return sorted(self._cities[key]) if key else None
+
+    def city_names(self, name):
+        """Stored spellings of the catalog cities `name` refers to, or None."""
+        if not self._check_ready():
+            return None
+        with self._lock:
+            key = self._match_city_key(name)
+            if not key:
+                return None
+            return sorted({s for counts in self._cities[key].values() for s in counts})
+
+    def find_city(self, text):
+        """The one catalog city free text mentions (most common spelling), or None.
+
+        Two-word names ("navi mumbai") are tried before their single words.
+        Exact names and aliases count anywhere; typos only right after a
+        location word ("in banglore"), so ordinary words ("thank" ~ Thane)
+        are never read as cities. Text that mentions more than one city is
+        ambiguous and returns None.
+        """
+        if not self._check_ready():
+            return None
+        words = normalize(text).split()
+        keys = set()
+        with self._lock:
+            i = 0
+            while i < len(words):
+                if words[i] in STOP_WORDS:
+                    i += 1
+                    continue
+                fuzzy = i > 0 and words[i - 1] in LOCATION_WORDS
+                pair = " ".join(words[i:i + 2]) if i + 1 < len(words) else None
+                key = self._match_city_key(pair, fuzzy) if pair else None
+                if key:
+                    i += 2
+                else:
+                    key = self._match_city_key(words[i], fuzzy)
+                    i += 1
+                if key:
+                    keys.add(key)
+            if len(keys) != 1:
+                return None
+            counts = Counter()
+            for spellings in self._cities[keys.pop()].values():
+                counts.update(spellings)
+            return counts.most_common(1)[0][0]
+
+    # ---------- TEXT SEARCH ----------
+    def _query_words(self, text):
+        words = [w for w in normalize(text).split() if w not in STOP_WORDS]
+        out, i = [], 0
+        while i < len(words):
+            pair = " ".join(words[i:i + 2])
+            if i + 1 < len(words) and pair in self.aliases:
+                out.append(self.aliases[pair])
+                i += 2
+                continue
+            out.append(self.aliases.get(words[i], words[i]))
+            i += 1
+        return out
+
+    def search(self, text, city_keys=None, limit=50):
+        """Listing ids ranked by how well title and city match `text`, or None if not built.
+
+        Each query word scores its best match per listing: IDF of the matched
+        word, discounted per typo. Listings matching every word are scored
+        first and the rest only when those are too few; words in more than
+        half the catalog only count when nothing rarer matched.
+        """
+        if not self._check_ready():
+            return None
+
+        with self._lock:
+            total = len(self._docs) or 1
+            terms = []  # (listings matched, [(weight, ids)] best first)
+            for word in dict.fromkeys(self._query_words(text)):
+                variants = sorted(
+                    ((math.log(1 + total / len(self._postings[m])) * (1 - edits / (len(word) + 1)), self._postings[m])
+                     for m, edits in self._word_vocab.similar(word, self._postings)),
+                    key=lambda v: v[0], reverse=True
+                )
+                if variants:
+                    matched = set().union(*(ids for _, ids in variants))
+                    terms.append((matched, variants))
+            if not terms:
+                return []
+
+            terms = [t for t in terms if len(t[0]) <= total / 2] or terms
+            wanted = set(city_keys) if city_keys else None
+
+            def in_city(doc_id):
+                return wanted is None or (self._docs[doc_id][0] or "").lower() in wanted
+
+            candidates = set.intersection(*(matched for matched, _ in terms))
+            candidates = {i for i in candidates if in_city(i)}
+            if len(candidates) < limit:
+                candidates = {i for i in set().union(*(matched for matched, _ in terms)) if in_city(i)}
+
+            def score(doc_id):
+                total_score = 0.0
+                for _, variants in terms:
+                    for weight, ids in variants:
+                        if doc_id in ids:
+                            total_score += weight
+                            break
+                return total_score
+
+            # Newest listing first among equal scores, so pages stay stable
+            return heapq.nlargest(limit, candidates, key=lambda i: (score(i), i))
+
+    def stats(self):
+        with self._lock:
+            return {"ready": int(self.ready), "listings": len(self._docs), "cities": len(self._cities), "words": len(self._postings)}
+
+
+fuzzy_index = FuzzyIndex(max_age=Config.FUZZY_INDEX_MAX_AGE, aliases=_parse_aliases(Config.CITY_ALIASES))
+
+
+def start_fuzzy_index():
+    """Builds the fuzzy search index in the background when enabled."""
+    if Config.FUZZY_SEARCH_ENABLED:
+        fuzzy_index.build_async()
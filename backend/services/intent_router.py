@@ -0,0 +1,183 @@
+import logging
+import re
+import time
+from threading import Lock
+from services.db import get_db
+from services.user_service import parse_budget
+from services.fuzzy_index import fuzzy_index
+
+logger = logging.getLogger(__name__)
+
+
+# Words that map a message to a listing action
+ACTION_PATTERNS = {
+    "Rent": re.compile(r"\b(rent|rental|renting|lease|leasing)\b", re.I),
+    "Buy": re.compile(r"\b(buy|buying|purchase|purchasing|for sale)\b", re.I),
+    "Sell": re.compile(r"\b(sell|selling)\b", re.I),
+}
+
+BHK_PATTERN = re.compile(r"\b(\d{1,2})\s*-?\s*(bhk|bed(room)?s?|rk)\b", re.I)
+
+# A number with an optional unit ("30k", "1.5 cr", "50 lakhs", "80,000")
+AMOUNT = r"(?:rs\.?|inr|₹)?\s*(\d+(?:,\d+)*(?:\.\d+)?)\s*(crores?|cr|lakhs?|lacs?|l|k|thousand)?\b"
+BUDGET_WITH_KEYWORD = re.compile(
+    r"\b(?:under|below|upto|up to|within|budget(?: of| is)?|max(?:imum)?|less than|around|for)\s*" + AMOUNT,
+    re.I
+)
+BUDGET_WITH_UNIT = re.compile(
+    r"(?:rs\.?|inr|₹)?\s*\b(\d+(?:\.\d+)?)\s*(crores?|cr|lakhs?|lacs?|l|k|thousand)\b",
+    re.I
+)
+
+# A bare number ("for 2 people", "for 12 months") is only a budget from this amount up
+MIN_BARE_BUDGET = 1000
+
+# Normalise spoken units to the suffixes parse_budget understands
+UNIT_SUFFIX = {
+    "crore": "cr", "crores": "cr", "cr": "cr",
+    "lakh": "l", "lakhs": "l", "lac": "l", "lacs": "l", "l": "l",
+    "k": "k", "thousand": "k",
+}
+
+# Known cities are read from the catalog and refreshed periodically
+CITY_REFRESH_SECONDS = 300
+_city_cache = {"cities": [], "loaded_at": 0.0}
+_city_lock = Lock()
+
+
+def known_cities():
+    """Returns the distinct listing cities, refreshed every few minutes."""
+    now = time.time()
+    if now - _city_cache["loaded_at"] < CITY_REFRESH_SECONDS:
+        return _city_cache["cities"]
+
+    with _city_lock:
+        if now - _city_cache["loaded_at"] >= CITY_REFRESH_SECONDS:
+            try:
+                cities = get_db().properties.distinct("city")
+                _city_cache["cities"] = [c for c in cities if isinstance(c, str) and c.strip()]
+            except Exception as e:
+                logger.error("Error loading known cities: %s", e)
+            _city_cache["loaded_at"] = now
+
+    return _city_cache["cities"]
+
+
+def _extract_action(text):
+    matches = [action for action, pattern in ACTION_PATTERNS.items() if pattern.search(text)]
+    # Ambiguous messages ("buy or rent?") are left for the agent
+    return matches[0] if len(matches) == 1 else None
+
+
+def _extract_city(text):
+    """The one city the message names, or None when it names none or several."""
+    spans = []
+    for city in known_cities():
+        for match in re.finditer(rf"\b{re.escape(city)}\b", text, re.I):
+            spans.append((match.start(), match.end(), city))
+
+    # Drop names inside a longer match ("Mumbai" within "Navi Mumbai")
+    mentioned = {
+        city.lower(): city for start, end, city in spans
+        if not any(s <= start and end <= e and (e - s) > (end - start) for s, e, _ in spans)
+    }
+    if len(mentioned) > 1:
+        # "in Pune, not in Mumbai": leave it to the agent
+        return None
+    if mentioned:
+        return next(iter(mentioned.values()))
+
+    # Renamed or misspelled cities ("Bengaluru", "Hyderbad")
+    return fuzzy_index.find_city(text)
+
+
+def _to_budget(number, unit):
+    number = number.replace(",", "")
+    suffix = UNIT_SUFFIX.get((unit or "").lower(), "")
+    return parse_budget(f"{number}{suffix}") or None
+
+
+def _extract_budget(text):
+    """Budget amount, preferring amounts with a unit ("25k") over bare numbers."""
+    keyword_matches = list(BUDGET_WITH_KEYWORD.finditer(text))
+
+    for match in keyword_matches:
+        if match.group(2):
+            return _to_budget(match.group(1), match.group(2))
+
+    unit_match = BUDGET_WITH_UNIT.search(text)
+    if unit_match:
+        return _to_budget(unit_match.group(1), unit_match.group(2))
+
+    # "under 25000" counts; "for 2 people" does not
+    for match in keyword_matches:
+        budget = _to_budget(match.group(1), None)
+        if budget and budget >= MIN_BARE_BUDGET:
+            return budget
+    return None
+
+
+def extract_slots(message: str) -> dict:
+    """Pulls action, city, BHK and budget out of a free-text search message."""
+    text = message or ""
+
+    bhk = None
+    bhk_match = BHK_PATTERN.search(text)
+    if bhk_match:
+        # "1RK" is listed as a single bedroom
+        bhk = int(bhk_match.group(1)) if bhk_match.group(2).lower() != "rk" else 1
+        # Remove the BHK span so "2 bhk" is not read as a budget
+        text = text[:bhk_match.start()] + " " + text[bhk_match.end():]
+
+    return {
+        "action": _extract_action(text),
+        "city": _extract_city(text),
+        "bhk": bhk,
+        "budget": _extract_budget(text),
+    }
+
+
+def is_complete(slots: dict) -> bool:
+    """True when the slots describe a search the fast path can answer."""
+    return (
+        slots.get("action") in ("Buy", "Rent")
+        and bool(slots.get("city"))
+        and bool(slots.get("bhk"))
+        and bool(slots.get("budget"))
+    )
+
+
+def build_analysis(slots: dict) -> dict:
+    """Builds the <analysis> payload the chat route logs for each inquiry."""
+    return {
+        "category": slots.get("action") or "General",
+        "urgency": "Low",
+        "location": slots.get("city"),
+        "budget": slots.get("budget"),
+        "bhk": slots.get("bhk"),
+        "ids": [],
+        "dates": []
+    }
+
+
+def fast_path_text(slots: dict, found: bool, within_budget: bool = True) -> str:
+    """Conversational line shown above fast-path search results.
+
+    `within_budget` is False when the results are the nearest-price fallback,
+    which only runs when nothing is priced within the budget.
+    """
+    verb = "rent" if slots["action"] == "Rent" else "buy"
+    if not found:
+        return (
+            f"I couldn't find any {slots['bhk']}BHK homes to {verb} in {slots['city']} right now. "
+            "Would you like to try a different budget or location?"
+        )
+    if not within_budget:
+        return (
+            f"I couldn't find any {slots['bhk']}BHK homes to {verb} in {slots['city']} "
+            f"within ₹{int(slots['budget']):,}. These are the closest to your budget."
+        )
+    return (
+        f"Here are some {slots['bhk']}BHK options to {verb} in {slots['city']} "
+        f"for your budget of ₹{int(slots['budget']):,}."
+    )
@@ -1,25 +1,54 @@
+import logging
 import json
-import re
-from typing import Optional, List, Any, Dict
-from datetime import datetime
+from contextvars import ContextVar
+from typing import Optional, List, Dict
 from bson.objectid import ObjectId
-from crewai import Agent, Task, Crew, Process, LLM
-from langchain.tools import tool
-from services.db import get_db
+from services.db import collection
+from models.property_model import agent_search_query, nearest_price_properties, PUBLIC_PROJECTION
+from services.property_index import property_index
+from services.intent_router import (
+    extract_slots,
+    is_complete,
+    fast_path_text,
+    build_analysis
+)
+from services.cache import response_cache, chat_cache_key, listing_tag
+from services.concierge import CONCIERGE_BACKSTORY, TASK_TEMPLATE
+from services.session_memory import record_turn, load_session
+from services.prompt_builder import build_prompt, log_prompt_tokens
+from services.rate_limiter import llm_scheduler, llm_user
+from services.response_parser import parse_response
+from config import Config
+from utils.metrics import span, timed
+from utils.logging_setup import SAMPLED
 import os
+import threading
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 # Use absolute path for .env
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 env_path = os.path.join(BASE_DIR, '.env')
 load_dotenv(dotenv_path=env_path)
 
-db = get_db()
-properties_collection = db.properties
-sessions_collection = db.chat_sessions
+properties_collection = collection("properties")
+
+# Groq model used by the agent and by streamed replies (LiteLLM provider prefix)
+CHAT_MODEL = "groq/llama-3.1-8b-instant"
+
+# Fixed text sent on every agent call. CrewAI adds its own tool/format
+# scaffolding on top, which shows up in the provider usage we log.
+AGENT_SYSTEM_PROMPT = CONCIERGE_BACKSTORY + "\n" + TASK_TEMPLATE.format(message="", history="")
+NO_HISTORY = "No history provided."
 
+# Property lists returned by the search tool during the current chat request.
+# The tool records them here so the route gets typed results out-of-band
+# instead of scraping them back out of the agent's text.
+tool_results = ContextVar("tool_results", default=None)
 
-@tool
+
+@timed("search_properties")
 def search_properties(
     action: Optional[str] = None, 
     location: Optional[str] = None, 
@@ -40,7 +69,7 @@ def search_properties(
             clean_id = property_id.replace("#", "").strip()
             # Try searching by ObjectId
             if len(clean_id) == 24:
-                prop = properties_collection.find_one({"_id": ObjectId(clean_id)})
+                prop = properties_collection.find_one({"_id": ObjectId(clean_id)}, dict(PUBLIC_PROJECTION))
                 if prop:
                     prop["_id"] = str(prop["_id"])
                     prop["location"] = prop.get("city")
@@ -49,41 +78,33 @@ def search_properties(
             # Fallback: search for ID as a string in other fields if needed, 
             # but usually users provide the hex ID
         except Exception as e:
-            print(f"Error searching by ID: {e}")
-
-    query = {}
-    if action:
-        query["action"] = {"$regex": f"^{action}$", "$options": "i"}
-    if location:
-        query["city"] = {"$regex": f"^{location}$", "$options": "i"}
-    if bhk:
-        try:
-            query["bedrooms"] = int(bhk)
-        except:
-            pass
-    
+            logger.error("Error searching by ID: %s", e)
+
+    query = agent_search_query(action=action, location=location, bhk=bhk)
+
+    # Same filters for the in-memory index; it returns None when it can't answer
+    city_lc = query.get("city_lc")
+    if isinstance(city_lc, dict):
+        city_lc = city_lc["$in"]
+    index_filters = {"action": action, "city_lc": city_lc, "bedrooms": query.get("bedrooms")}
+
     # Try strict price first
     strict_query = query.copy()
     if max_price:
         strict_query["price"] = {"$lte": float(max_price)}
+
+    results = property_index.cheapest(Config.NEAREST_PRICE_K, max_price=max_price, **index_filters)
+    if results is None:
+        results = list(properties_collection.find(strict_query).sort("price", 1).limit(Config.NEAREST_PRICE_K))
     
-    results = list(properties_collection.find(strict_query).sort("price", 1).limit(2))
-    
-    # Fallback: If no results with strict budget, try "around the price"
+    # Fallback: If no results with strict budget, recommend the closest prices
     if not results and max_price:
-        print("No exact budget matches, performing flexible search...")
-        # Search for properties in the same city/action but slightly higher budget or just any price sorted by closeness
-        flex_query = query.copy()
-        # No strict budget filter, just sort by price proximity
-        # We'll fetch properties and sort by distance to target price in Python for simplicity
-        results = list(properties_collection.find(flex_query).sort("price", 1).limit(20))
-        
+        logger.info("No exact budget matches, performing flexible search", extra=SAMPLED)
+        results = property_index.nearest(float(max_price), Config.NEAREST_PRICE_K, **index_filters)
+        if results is None:
+            results = nearest_price_properties(query, float(max_price))
         if results:
-            target = float(max_price)
-            # Sort by absolute difference to target price
-            results.sort(key=lambda x: abs((x.get("price") or 0) - target))
-            results = results[:2] # Keep top 2 closest
-            print(f"Found {len(results)} recommendations around the price.")
+            logger.info("Found %d recommendations around the price", len(results), extra=SAMPLED)
 
     essential_results = []
     for r in results:
@@ -102,127 +123,224 @@ def search_properties(
     
     return "MANDATORY_JSON_RESULTS: " + json.dumps(essential_results)
 
-from crewai.tools import BaseTool
+def capture_tool_result(tool_output: str):
+    """Records a search tool result on the current request, if one is collecting."""
+    results = tool_results.get()
+    if results is not None:
+        results.append(_tool_properties(tool_output))
 
-class SearchPropertiesTool(BaseTool):
-    name: str = "search_properties"
-    description: str = "Search for properties based on user requirements (Buy/Rent, Location, BHK, Max Price, Property ID)."
+# ---------- AGENT STACK ----------
+_agent_stack = None
+_agent_stack_lock = threading.Lock()
 
-    def _run(self, action: Optional[str] = None, location: Optional[str] = None, bhk: Optional[int] = None, max_price: Optional[float] = None, property_id: Optional[str] = None) -> str:
-        return search_properties(
-            action=action,
-            location=location,
-            bhk=bhk,
-            max_price=max_price,
-            property_id=property_id
-        )
 
-search_properties_crew = SearchPropertiesTool()
+def get_agent_stack():
+    """Imports CrewAI and builds the LLM and pipeline pool on first use."""
+    global _agent_stack
+    if _agent_stack is None:
+        with _agent_stack_lock:
+            if _agent_stack is None:
+                from services import agent_stack
+                _agent_stack = agent_stack
+    return _agent_stack
 
-# LLM Setup - Using 8B model for higher rate limits on free tier
-# Ensure CrewAI sees the API key in the environment
-groq_key = os.getenv("GROQ_API_KEY")
 
-if groq_key:
-    os.environ["GROQ_API_KEY"] = groq_key
+def warm_agent_stack():
+    """Loads the agent stack and pre-builds one pipeline ahead of the first /chat."""
+    get_agent_stack().pipeline_pool.warm()
 
-# Explicitly use the Groq provider via LiteLLM prefix
-llm = LLM(
-    model="groq/llama-3.1-8b-instant",
-    temperature=0
-)
 
-# CrewAI Agents
-concierge_agent = Agent(
-    role="Real Estate Concierge",
-    goal="Help users find property.",
-    backstory="""You are a helpful and conversational real estate concierge.
-    Rules: 
-    1. Be conversational and polite.
-    2. Do NOT assume a location, budget, or other details unless explicitly stated by the user. If missing, ASK clarifying questions politely.
-    3. Ask ONE question at a time.
-    4. When you have enough info, use the search tool.
-    5. NO property text/bullets. Output ONLY JSON for results when the search tool returns properties.
-    6. Ignore stale city/action if the user changes the topic.""",
-    verbose=False,
-    allow_delegation=False,
-    llm=llm,
-    tools=[search_properties_crew],
-    max_iter=2,
-    max_rpm=10
-)
+def start_agent_warmup():
+    """Warms the agent stack in the background when CHAT_WARMUP is enabled."""
+    if not Config.CHAT_WARMUP:
+        return
 
-def get_session_history(email: str) -> List[Dict]:
-    """Retrieve chat history from MongoDB."""
-    session = sessions_collection.find_one({"email": email})
-    if session:
-        return session.get("history", [])
-    return []
+    def run():
+        try:
+            warm_agent_stack()
+            logger.info("Agent stack warmed up")
+        except Exception as e:
+            logger.warning("Agent warmup failed: %s", e)
 
-def save_session_history(email: str, history: List[Dict]):
-    """Save chat history to MongoDB."""
-    sessions_collection.update_one(
-        {"email": email},
-        {"$set": {"history": history, "last_updated": datetime.utcnow()}},
-        upsert=True
-    )
+    threading.Thread(target=run, name="agent-warmup", daemon=True).start()
 
-def process_chat_message(email: str, message: str) -> str:
-    """Processes a message using CrewAI agents and manages session history."""
-    # history = get_session_history(email)
-    
-    # Minimal history for TPM savings
-    # formatted_history = "\n".join([f"{m['role']}: {m['content'][:200]}" for m in history[-2:]])
-    formatted_history = "No history provided."
-    
-    unified_task = Task(
-        description=f"Msg: '{message}' | History: {formatted_history}\nRules: if 'MANDATORY_JSON_RESULTS' found, use ONLY JSON block. No descriptions.",
-        expected_output="Text + JSON block.",
-        agent=concierge_agent
-    )
-    
-    crew = Crew(
-        agents=[concierge_agent],
-        tasks=[unified_task],
-        process=Process.sequential
-    )
-    
+def chat_reply(text: str, properties: List[Dict], analysis: Dict) -> Dict:
+    """The structured answer returned by process_chat_message and cached."""
+    return {"response": text, "properties": properties, "analysis": analysis}
+
+def _merge_properties(*lists) -> List[Dict]:
+    """Concatenates property lists, keeping the first copy of each listing."""
+    seen = set()
+    merged = []
+    for props in lists:
+        for prop in props:
+            key = prop.get("_id") or json.dumps(prop, sort_keys=True, default=str)
+            if key not in seen:
+                seen.add(key)
+                merged.append(prop)
+    return merged
+
+def fast_path_response(slots: dict) -> Optional[Dict]:
+    """Answers fully specified searches without an LLM round trip."""
+    if not Config.CHAT_FAST_PATH or not is_complete(slots):
+        return None
+
+    properties = _tool_properties(search_properties(
+        action=slots["action"],
+        location=slots["city"],
+        bhk=slots["bhk"],
+        max_price=slots["budget"]
+    ))
+    # search_properties only falls back to nearest-price listings when none fit the budget
+    within_budget = all(_number(p.get("price")) and p["price"] <= slots["budget"] for p in properties)
+    text = fast_path_text(slots, bool(properties), within_budget)
+    return chat_reply(text, properties, build_analysis(slots))
+
+
+def _number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def process_chat_message(email: str, message: str) -> Dict:
+    """Processes a message using CrewAI agents and manages session history.
+
+    Returns {"response", "properties", "analysis"}: the reply text without
+    any JSON, the listings found by the search tool, and the inquiry analysis.
+    """
+    slots = extract_slots(message)
+
+    # Near-identical searches share one answer until a matching listing changes.
+    # Only fast-path replies are cached: they depend on the message alone, while
+    # agent replies draw on the user's session and must not reach other users.
+    cacheable = Config.CHAT_CACHE_ENABLED and Config.CHAT_FAST_PATH and is_complete(slots)
+    cache_key = chat_cache_key(slots) if cacheable else None
+    if cache_key:
+        with span("chat_cache"):
+            cached = response_cache.get(cache_key)
+        if cached is not None:
+            record_turn(email, message, cached["response"], slots)
+            return cached
+
+    # Structured searches ("2BHK rent in Pune under 30k") skip the agent entirely
+    fast_reply = fast_path_response(slots)
+    if fast_reply is not None:
+        if cache_key:
+            response_cache.set(cache_key, fast_reply, listing_tag(slots["city"], slots["action"]))
+        record_turn(email, message, fast_reply["response"], slots)
+        return fast_reply
+
+    # Summary plus as many recent turns as fit what's left of the token budget
+    with span("prompt_build"):
+        prompt = build_prompt(AGENT_SYSTEM_PROMPT, message, load_session(email))
+    formatted_history = prompt["history"] or NO_HISTORY
+
+    user_token = llm_user.set(email)
+    captured = []
+    results_token = tool_results.set(captured)
     try:
-        result = crew.kickoff()
+        with span("agent_setup"):
+            pool = get_agent_stack().pipeline_pool
+        # Includes the Groq calls (llm_queue / llm_call spans) and tool runs
+        with span("crew_kickoff"):
+            result = pool.kickoff(prompt["message"], formatted_history)
     except Exception as e:
-        print(f"CrewAI Kickoff Error: {e}")
+        logger.error("CrewAI kickoff error: %s", e)
         raise e
-    
-    # Update history
-    # history.append({"role": "user", "content": message, "timestamp": datetime.utcnow()})
-    # history.append({"role": "assistant", "content": str(result), "timestamp": datetime.utcnow()})
-    # save_session_history(email, history)
-    
-    return str(result)
+    finally:
+        tool_results.reset(results_token)
+        llm_user.reset(user_token)
 
-def parse_analysis(text: str) -> dict:
-    """Parses the <analysis> tag from LLM response."""
-    try:
-        match = re.search(r"<analysis>(.*?)</analysis>", text, re.DOTALL)
-        if match:
-            data = json.loads(match.group(1))
-            # Harden: Ensure it's a dict, not a list
-            if isinstance(data, list) and len(data) > 0:
-                data = data[0]
-            if isinstance(data, dict):
-                return data
-    except Exception as e:
-        print(f"Error parsing analysis: {e}")
-    
-    return {
-        "category": "General",
-        "urgency": "Low",
-        "location": None,
-        "budget": None,
-        "bhk": None,
-        "ids": [],
-        "dates": []
-    }
-
-def extract_text(content: Any) -> str:
-    return str(content)
+    log_prompt_tokens("agent", prompt["tokens"], _usage(result))
+
+    # One pass over the text; listings come from the tool when it returned any
+    with span("parse_response"):
+        parsed = parse_response(str(result))
+    properties = _merge_properties(*captured) or _merge_properties(parsed["properties"])
+    reply = chat_reply(parsed["text"], properties, parsed["analysis"] or build_analysis(slots))
+
+    with span("session_save"):
+        record_turn(email, message, reply["response"], slots)
+
+    return reply
+
+def _usage(result) -> Optional[Dict]:
+    """Token usage reported by the provider for a crew run, if any."""
+    usage = getattr(result, "token_usage", None)
+    if usage is None:
+        return None
+    return {k: getattr(usage, k, None) for k in ("prompt_tokens", "completion_tokens", "total_tokens")}
+
+def _tool_properties(tool_output: str) -> List[Dict]:
+    """Decodes the property list from a search_properties result string."""
+    if tool_output.startswith("MANDATORY_JSON_RESULTS:"):
+        return json.loads(tool_output[len("MANDATORY_JSON_RESULTS:"):])
+    # Lookups by property id return the bare JSON list
+    if tool_output.startswith("["):
+        return json.loads(tool_output)
+    return []
+
+def stream_chat_message(email: str, message: str):
+    """Streams a chat answer as (event, data) pairs.
+
+    Search results are emitted as a "properties" event as soon as the search
+    returns, followed by "token" events from the LLM and a final "done" event
+    carrying the analysis used for inquiry logging.
+    """
+    slots = extract_slots(message)
+    analysis = build_analysis(slots)
+
+    properties = None
+    if slots["action"] in ("Buy", "Rent") and slots["city"]:
+        properties = _tool_properties(search_properties(
+            action=slots["action"],
+            location=slots["city"],
+            bhk=slots["bhk"],
+            max_price=slots["budget"]
+        ))
+        yield "properties", properties
+
+    # Fully specified searches need no LLM text at all
+    if Config.CHAT_FAST_PATH and is_complete(slots):
+        text = fast_path_text(slots, bool(properties))
+        yield "token", text
+        record_turn(email, message, text, slots)
+        yield "done", {"analysis": analysis}
+        return
+
+    if properties is None:
+        context = "No search has been run yet."
+    elif properties:
+        context = f"{len(properties)} matching properties are already shown to the user as cards. Do NOT list them."
+    else:
+        context = "The search returned no properties for these criteria."
+
+    prompt = build_prompt(CONCIERGE_BACKSTORY, message, load_session(email), tool_context=context)
+    log_prompt_tokens("stream", prompt["tokens"])
+
+    messages = [
+        {"role": "system", "content": prompt["system"]},
+        {"role": "user", "content": f"Msg: '{prompt['message']}' | History: {prompt['history'] or NO_HISTORY} | Search: {prompt['tools']}\nReply in one or two short sentences."}
+    ]
+
+    import litellm
+
+    # A 429 arrives with the response headers, before any token is streamed
+    stream = llm_scheduler.run(
+        email,
+        prompt["tokens"]["total"] + Config.LLM_COMPLETION_TOKENS,
+        lambda: litellm.completion(
+            model=CHAT_MODEL,
+            messages=messages,
+            temperature=0,
+            stream=True,
+            api_base=Config.LLM_BASE_URL
+        )
+    )
+    reply = []
+    for chunk in stream:
+        delta = chunk.choices[0].delta.content
+        if delta:
+            reply.append(delta)
+            yield "token", delta
+
+    record_turn(email, message, "".join(reply), slots)
+    yield "done", {"analysis": analysis}
@@ -0,0 +1,23 @@
+import logging
+from models import market_stats, property_model, user_model
+from services import session_memory
+from services.cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_indexes():
+    """Creates every index the app relies on. Safe to re-run; existing indexes are left as is."""
+    user_model.ensure_indexes()
+    property_model.ensure_indexes()
+    market_stats.ensure_indexes()
+    session_memory.ensure_indexes()
+
+    # Only the shared Mongo cache backend has indexes
+    if hasattr(response_cache.backend, "ensure_indexes"):
+        response_cache.backend.ensure_indexes()
+
+
+def run_migrations():
+    ensure_indexes()
+    logger.info("Indexes are up to date")
@@ -0,0 +1,147 @@
+import logging
+import threading
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # optional: without tiktoken tokens are estimated from length
+    tiktoken = None
+
+
+# Groq's Llama tokenizer isn't shipped locally; cl100k_base counts within a few
+# percent of it on English chat text, which is close enough for budgeting.
+# tiktoken reads the encoding from TIKTOKEN_CACHE_DIR (the Docker image
+# pre-fetches it there) and otherwise downloads it once. When neither works
+# (offline, no cache) token counts are estimated as characters / 4.
+ENCODING_NAME = "cl100k_base"
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                if tiktoken is not None:
+                    try:
+                        _encoding = tiktoken.get_encoding(ENCODING_NAME)
+                    except Exception as e:
+                        logger.warning("Tokenizer unavailable, estimating tokens: %s", e)
+                _encoding_loaded = True
+    return _encoding
+
+
+def load_tokenizer():
+    """Loads the encoding off the request path (called from a startup thread)."""
+    return _get_encoding()
+
+
+def count_tokens(text):
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def trim_to_tokens(text, max_tokens):
+    """Cuts text to at most `max_tokens` tokens, marking the cut with "..."."""
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        kept = encoding.decode(encoding.encode(text, disallowed_special=())[:max(max_tokens - 1, 0)])
+    else:
+        kept = text[:max(max_tokens - 1, 0) * CHARS_PER_TOKEN]
+    return kept.rstrip() + "..."
+
+
+# ---------- BUDGET ----------
+def allocate(system, message, tool_context="", total=None):
+    """Splits the per-request token budget across the prompt sections.
+
+    System rules are fixed and always counted in full. The user message and
+    tool results are capped at PROMPT_MESSAGE_TOKENS / PROMPT_TOOL_TOKENS.
+    History (summary first, then recent turns) gets what is left, up to
+    SESSION_HISTORY_TOKENS.
+    """
+    total = Config.PROMPT_TOKEN_BUDGET if total is None else total
+    remaining = max(total - count_tokens(system), 0)
+
+    message_budget = min(count_tokens(message), Config.PROMPT_MESSAGE_TOKENS, remaining)
+    remaining -= message_budget
+
+    tool_budget = min(count_tokens(tool_context), Config.PROMPT_TOOL_TOKENS, remaining)
+    remaining -= tool_budget
+
+    return {
+        "message": message_budget,
+        "tools": tool_budget,
+        "history": min(remaining, Config.SESSION_HISTORY_TOKENS)
+    }
+
+
+def build_history(session, budget):
+    """Summary line plus the newest turns that fit in `budget` tokens, oldest first."""
+    lines = []
+    used = 0
+
+    if session.get("summary"):
+        summary = f"Summary: {session['summary']}"
+        cost = count_tokens(summary)
+        if cost <= budget:
+            lines.append(summary)
+            used = cost
+
+    recent = []
+    for turn in reversed(session.get("turns", [])):
+        line = f"{turn['role']}: {turn['content']}"
+        # +1 for the newline joining it to the previous line
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            break
+        recent.append(line)
+        used += cost
+
+    lines.extend(reversed(recent))
+    return "\n".join(lines)
+
+
+def build_prompt(system, message, session, tool_context="", total=None):
+    """Assembles the trimmed prompt sections and their token counts.
+
+    Trimming is deterministic: the same inputs always give the same prompt,
+    so cached answers and logged counts stay comparable between requests.
+    """
+    budget = allocate(system, message, tool_context, total)
+
+    parts = {
+        "system": system,
+        "message": trim_to_tokens(message, budget["message"]),
+        "tools": trim_to_tokens(tool_context, budget["tools"]),
+        "history": build_history(session, budget["history"])
+    }
+    tokens = {name: count_tokens(text) for name, text in parts.items()}
+    tokens["total"] = sum(tokens.values())
+
+    return {**parts, "tokens": tokens}
+
+
+def log_prompt_tokens(route, tokens, usage=None):
+    """Logs the per-request prompt token counts (and the provider's usage when known)."""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    line = " ".join(f"{name}={count}" for name, count in tokens.items())
+    if usage:
+        line += f" | usage prompt={usage.get('prompt_tokens')} completion={usage.get('completion_tokens')} total={usage.get('total_tokens')}"
+    logger.info("Prompt tokens [%s]: %s", route, line, extra={"route": route, "tokens": tokens, "usage": usage, "sampled": True})
@@ -0,0 +1,135 @@
+import csv
+import json
+from models.property_model import build_property_doc, insert_properties
+from services.user_service import parse_budget
+from config import Config
+
+# Keep reports bounded when a whole feed is malformed
+MAX_REPORTED_ERRORS = 1000
+
+ACTIONS = {"buy": "Buy", "sale": "Buy", "sell": "Buy", "rent": "Rent"}
+
+
+def detect_format(filename=None, content_type=None):
+    """Guesses "csv" or "jsonl" from a filename or content type."""
+    name = (filename or "").lower()
+    ctype = (content_type or "").lower()
+    if name.endswith(".csv") or "csv" in ctype:
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson", ".json")) or "json" in ctype:
+        return "jsonl"
+    return None
+
+
+def iter_rows(stream, fmt):
+    """Yields (row number, dict or parse error) from a text stream, one row at a time."""
+    if fmt == "csv":
+        for line_no, row in enumerate(csv.DictReader(stream), start=1):
+            yield line_no, row
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_no, ValueError(f"Invalid JSON: {e}")
+                continue
+            if not isinstance(row, dict):
+                row = ValueError("Each line must be a JSON object")
+            yield line_no, row
+    else:
+        raise ValueError("Unsupported format; use csv or jsonl")
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _int_field(row, field):
+    value = row.get(field)
+    if _blank(value):
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number")
+
+
+def validate_row(row, listed_by=None, row_owner=False):
+    """Coerces one feed row into create_property input, raising ValueError if invalid.
+
+    A row's own listed_by column is honoured only with row_owner=True (the CLI
+    importer); otherwise every row is attributed to `listed_by`.
+    """
+    missing = [f for f in ("title", "price", "city") if _blank(row.get(f))]
+    if missing:
+        raise ValueError(f"Missing fields: {missing}")
+
+    price = parse_budget(row["price"])
+    if not price or price < 0:
+        raise ValueError("price must be a positive amount")
+
+    action = ACTIONS.get(str(row.get("action") or "buy").strip().lower())
+    if not action:
+        raise ValueError("action must be Buy or Rent")
+
+    data = {
+        "title": str(row["title"]).strip(),
+        "price": int(price) if float(price).is_integer() else price,
+        "city": str(row["city"]).strip(),
+        "action": action,
+        "listed_by": (row_owner and not _blank(row.get("listed_by")) and str(row["listed_by"]).strip()) or listed_by
+    }
+
+    for field in ("bedrooms", "bathrooms"):
+        value = _int_field(row, field)
+        if value is not None:
+            data[field] = value
+
+    if not _blank(row.get("area_sqft")):
+        try:
+            data["area_sqft"] = float(row["area_sqft"])
+        except (TypeError, ValueError):
+            raise ValueError("area_sqft must be a number")
+
+    return data
+
+
+def import_listings(rows, batch_size=None, listed_by=None, row_owner=False):
+    """Validates and inserts rows in batches; returns a per-row error report."""
+    batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+    report = {"inserted": 0, "failed": 0, "errors": []}
+
+    def record_error(row_no, message):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": row_no, "error": message})
+
+    def flush(batch):
+        inserted, failures = insert_properties([doc for _, doc in batch])
+        report["inserted"] += inserted
+        for position, message in failures:
+            record_error(batch[position][0], message)
+
+    batch = []
+    for row_no, row in rows:
+        if isinstance(row, Exception):
+            record_error(row_no, str(row))
+            continue
+
+        try:
+            batch.append((row_no, build_property_doc(validate_row(row, listed_by, row_owner))))
+        except ValueError as e:
+            record_error(row_no, str(e))
+            continue
+
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+
+    if batch:
+        flush(batch)
+
+    return report
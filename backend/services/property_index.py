@@ -0,0 +1,283 @@
+import logging
+import threading
+import time
+from bson.objectid import ObjectId
+from services.db import get_db
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # optional: without NumPy every search goes to Mongo
+    np = None
+
+
+MISSING_BEDROOMS = -1
+COLUMNS = ("price", "bedrooms", "action", "city", "id_hi", "id_lo", "alive", "titles")
+
+
+def _empty_columns(capacity):
+    return {
+        "price": np.full(capacity, np.nan),
+        "bedrooms": np.full(capacity, MISSING_BEDROOMS, dtype=np.int32),
+        "action": np.zeros(capacity, dtype=np.int16),
+        "city": np.zeros(capacity, dtype=np.int32),
+        # ObjectId split into sortable integers (NumPy "S" strings drop trailing NULs)
+        "id_hi": np.zeros(capacity, dtype=np.uint64),
+        "id_lo": np.zeros(capacity, dtype=np.uint32),
+        "alive": np.zeros(capacity, dtype=bool),
+        "titles": np.empty(capacity, dtype=object),
+    }
+
+
+def _lc(value):
+    if value is None:
+        return None
+    return str(value).strip().lower()
+
+
+def _object_id(hi, lo):
+    return ObjectId(int(hi).to_bytes(8, "big") + int(lo).to_bytes(4, "big"))
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class PropertyIndex:
+    """Read-through, in-process columnar index over the properties collection.
+
+    Each listing is one row across parallel NumPy arrays (price, bedrooms,
+    action code, city code, ObjectId, title), so searches are vectorised
+    masks instead of Mongo round trips. Rows are kept in sync by the property
+    write hooks, and the whole index is rebuilt once it is older than
+    PROPERTY_INDEX_MAX_AGE to bound staleness from writes made by other
+    processes. Lookups return None on a miss (disabled, not built yet, or an
+    unsupported query) and callers fall back to Mongo.
+    """
+
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self.ready = False
+        self.built_at = 0.0
+        self._lock = threading.Lock()
+        self._building = False
+        self._size = 0
+        self._dead = 0
+        self._rows = {}
+        self._codes = {"action": {}, "city": {}}
+        self._names = {"action": [], "city": []}
+        self._cols = _empty_columns(0) if np is not None else None
+
+    # ---------- STORAGE ----------
+    def _code(self, kind, value):
+        codes = self._codes[kind]
+        if value not in codes:
+            codes[value] = len(self._names[kind])
+            self._names[kind].append(value)
+        return codes[value]
+
+    def _grow(self):
+        grown = _empty_columns(max(1024, len(self._cols["price"]) * 2))
+        for name in COLUMNS:
+            grown[name][:self._size] = self._cols[name][:self._size]
+        self._cols = grown
+
+    def _add(self, doc):
+        key = doc["_id"].binary
+        row = self._rows.get(key)
+        if row is None:
+            if self._size == len(self._cols["price"]):
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._rows[key] = row
+
+        price, bedrooms = doc.get("price"), doc.get("bedrooms")
+        cols = self._cols
+        cols["id_hi"][row] = int.from_bytes(key[:8], "big")
+        cols["id_lo"][row] = int.from_bytes(key[8:], "big")
+        cols["price"][row] = price if _number(price) else np.nan
+        cols["bedrooms"][row] = bedrooms if _number(bedrooms) else MISSING_BEDROOMS
+        cols["action"][row] = self._code("action", doc.get("action"))
+        cols["city"][row] = self._code("city", doc.get("city"))
+        cols["titles"][row] = doc.get("title")
+        cols["alive"][row] = True
+
+    def _remove(self, doc_id):
+        row = self._rows.pop(doc_id.binary, None)
+        if row is not None:
+            self._cols["alive"][row] = False
+            self._dead += 1
+
+    # ---------- MAINTENANCE ----------
+    def build(self):
+        """Loads the index from Mongo and swaps it in atomically."""
+        fresh = PropertyIndex(self.max_age)
+        fields = {"price": 1, "bedrooms": 1, "action": 1, "city": 1, "title": 1}
+        for doc in get_db().properties.find({}, fields):
+            fresh._add(doc)
+
+        with self._lock:
+            self._size, self._dead, self._rows = fresh._size, 0, fresh._rows
+            self._codes, self._names, self._cols = fresh._codes, fresh._names, fresh._cols
+            self.built_at = time.time()
+            self.ready = True
+
+        logger.info("Property index built with %d listings", fresh._size)
+
+    def build_async(self):
+        """Builds (or rebuilds) the index on a background thread."""
+        with self._lock:
+            if self._building or np is None:
+                return
+            self._building = True
+
+        def run():
+            try:
+                self.build()
+            except Exception as e:
+                logger.error("Error building property index: %s", e)
+            finally:
+                self._building = False
+
+        threading.Thread(target=run, name="property-index-build", daemon=True).start()
+
+    def apply_changes(self, added=(), removed=()):
+        """Write hook: mirrors listing inserts, updates and deletes."""
+        if not self.ready:
+            return
+
+        with self._lock:
+            for doc in removed:
+                self._remove(doc["_id"])
+            for doc in added:
+                self._add(doc)
+            compact = self._dead > max(1024, self._size // 2)
+
+        if compact:
+            self.build_async()
+
+    # ---------- QUERY ----------
+    def _snapshot(self):
+        """Consistent view of the live columns, or None when the index can't answer."""
+        if np is None or not self.ready:
+            return None
+
+        if time.time() - self.built_at > self.max_age:
+            self.build_async()
+
+        with self._lock:
+            n = self._size
+            # Slices are views; copy so in-place updates after the lock is released don't leak in
+            snap = {name: self._cols[name][:n].copy() for name in COLUMNS}
+            snap["codes"] = {kind: dict(codes) for kind, codes in self._codes.items()}
+            snap["names"] = {kind: list(names) for kind, names in self._names.items()}
+            return snap
+
+    def _mask(self, snap, action=None, city=None, city_lc=None, bedrooms=None, min_price=None, max_price=None):
+        """Boolean row mask for the filters; None when no listing can match."""
+        mask = snap["alive"]
+
+        # city / city_lc may list several names (spellings resolved by the fuzzy index)
+        if city is not None:
+            names = city if isinstance(city, (list, tuple)) else [city]
+            codes = [snap["codes"]["city"][n] for n in names if n in snap["codes"]["city"]]
+            if not codes:
+                return None
+            mask = mask & np.isin(snap["city"], codes)
+
+        # Case-insensitive filters match every spelling variant's code
+        for column, value in (("action", action), ("city", city_lc)):
+            if value is None:
+                continue
+            wanted = {_lc(v) for v in value} if isinstance(value, (list, tuple)) else {_lc(value)}
+            codes = [c for name, c in snap["codes"][column].items() if _lc(name) in wanted]
+            if not codes:
+                return None
+            mask = mask & np.isin(snap[column], codes)
+
+        if bedrooms is not None:
+            mask = mask & (snap["bedrooms"] == int(bedrooms))
+        if min_price is not None:
+            mask = mask & (snap["price"] >= float(min_price))
+        if max_price is not None:
+            mask = mask & (snap["price"] <= float(max_price))
+        return mask
+
+    def _priced_rows(self, snap, filters):
+        mask = self._mask(snap, **filters)
+        if mask is None:
+            return np.empty(0, dtype=np.intp)
+        return np.flatnonzero(mask & ~np.isnan(snap["price"]))
+
+    def search(self, sort_field="price", order=1, skip=0, limit=5, **filters):
+        """Returns ObjectIds for one page of results, or None on a miss."""
+        if sort_field not in ("price", "bedrooms"):
+            return None
+
+        snap = self._snapshot()
+        if snap is None:
+            return None
+
+        mask = self._mask(snap, **filters)
+        if mask is None:
+            return []
+
+        rows = np.flatnonzero(mask)
+        if sort_field == "price" and np.isnan(snap["price"][rows]).any():
+            # Mongo orders non-numeric prices by BSON type; leave those to Mongo
+            return None
+
+        ranked = rows[np.lexsort((snap["id_lo"][rows], snap["id_hi"][rows], snap[sort_field][rows]))]
+        if order == -1:
+            ranked = ranked[::-1]
+        return [_object_id(snap["id_hi"][r], snap["id_lo"][r]) for r in ranked[skip:skip + limit]]
+
+    def cheapest(self, k, **filters):
+        """Essential fields of the k cheapest matches, or None on a miss."""
+        snap = self._snapshot()
+        if snap is None:
+            return None
+
+        rows = self._priced_rows(snap, filters)
+        ranked = rows[np.lexsort((snap["id_lo"][rows], snap["id_hi"][rows], snap["price"][rows]))][:k]
+        return [self._essential(snap, r) for r in ranked]
+
+    def nearest(self, target, k, **filters):
+        """Essential fields of the k matches priced closest to target, or None on a miss."""
+        snap = self._snapshot()
+        if snap is None:
+            return None
+
+        rows = self._priced_rows(snap, filters)
+        prices = snap["price"][rows]
+        # Closest first, cheaper listing first on equal distance
+        ranked = rows[np.lexsort((prices, np.abs(prices - float(target))))][:k]
+        return [self._essential(snap, r) for r in ranked]
+
+    def _essential(self, snap, row):
+        price = float(snap["price"][row])
+        bedrooms = int(snap["bedrooms"][row])
+        return {
+            "_id": _object_id(snap["id_hi"][row], snap["id_lo"][row]),
+            "title": snap["titles"][row],
+            "price": int(price) if price.is_integer() else price,
+            "city": snap["names"]["city"][snap["city"][row]],
+            "bedrooms": None if bedrooms == MISSING_BEDROOMS else bedrooms,
+            "action": snap["names"]["action"][snap["action"][row]]
+        }
+
+
+property_index = PropertyIndex(max_age=Config.PROPERTY_INDEX_MAX_AGE)
+
+
+def start_property_index():
+    """Builds the index in the background when enabled and NumPy is available."""
+    if not Config.PROPERTY_INDEX_ENABLED:
+        return
+    if np is None:
+        logger.warning("PROPERTY_INDEX_ENABLED is set but NumPy is not installed; using Mongo for searches")
+        return
+    property_index.build_async()
@@ -0,0 +1,192 @@
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from config import Config
+from utils.metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Who the current LLM call is for; set by the chat service so calls made deep
+# inside CrewAI are still queued under the right user
+llm_user = ContextVar("llm_user", default="anonymous")
+
+
+class RateLimitedError(Exception):
+    """The LLM provider stayed rate limited, or the request waited too long for a slot."""
+
+
+def is_rate_limit_error(e):
+    """True for our own RateLimitedError and for provider 429s however they're wrapped."""
+    if isinstance(e, RateLimitedError):
+        return True
+    if getattr(e, "status_code", None) == 429:
+        return True
+    err_str = str(e).lower()
+    return "rate_limit" in err_str or "limit reached" in err_str or "429" in err_str
+
+
+def retry_after(e):
+    """Seconds from a Retry-After header on a provider error, if it carried one."""
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or getattr(e, "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class TokenBucket:
+    """Refills `limit` units per minute, holding at most one minute's worth.
+
+    Not thread-safe on its own; LLMScheduler guards it with its condition lock.
+    """
+
+    def __init__(self, limit):
+        self.capacity = float(limit)
+        self.rate = limit / 60.0
+        self.level = float(limit)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` units are available (0 if they are now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def drain(self):
+        """Empties the bucket, e.g. after the provider answered 429."""
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+
+class LLMScheduler:
+    """Process-wide RPM/TPM limiter for LLM calls with fair per-user ordering.
+
+    Callers queue per user and users are served round robin, so one user's
+    burst can't starve everyone else. A request proceeds once both the
+    request and token buckets can cover it; it gives up with
+    RateLimitedError after `queue_timeout` seconds. Provider 429s are
+    retried up to `max_retries` times, waiting for Retry-After (or
+    exponential backoff) with jitter.
+    """
+
+    def __init__(self, rpm=30, tpm=6000, max_retries=3, queue_timeout=30, backoff=1.0):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.queue_timeout = queue_timeout
+        self.backoff = backoff
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # user -> deque of waiting tickets, in round-robin order
+        self.counters = {"granted": 0, "timeouts": 0, "retries": 0, "rate_limited": 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _is_next(self, user, ticket):
+        first_user = next(iter(self._queues))
+        return first_user == user and self._queues[user][0] is ticket
+
+    def _dequeue(self, user, ticket):
+        waiting = self._queues.get(user)
+        if waiting is None:
+            return
+        waiting.remove(ticket)
+        if waiting:
+            self._queues.move_to_end(user)
+        else:
+            del self._queues[user]
+
+    def acquire(self, user, tokens):
+        """Blocks until this user's request may be sent; returns seconds waited."""
+        ticket = object()
+        start = time.monotonic()
+        deadline = start + self.queue_timeout
+
+        with self._cond:
+            self._queues.setdefault(user, deque()).append(ticket)
+            while True:
+                wait = None
+                if self._is_next(user, ticket):
+                    wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if wait <= 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        self._dequeue(user, ticket)
+                        break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._dequeue(user, ticket)
+                    self.counters["timeouts"] += 1
+                    self._cond.notify_all()
+                    raise RateLimitedError("Timed out waiting for an LLM request slot")
+                self._cond.wait(min(wait, remaining) if wait is not None else remaining)
+
+            waited = time.monotonic() - start
+            self.counters["granted"] += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            # The next user in line may be able to go right away
+            self._cond.notify_all()
+
+        if waited > 1:
+            logger.info("LLM request waited %.1fs for a rate limit slot", waited, extra={"user": user, "sampled": True})
+        return waited
+
+    def run(self, user, tokens, fn):
+        """Calls fn() within the limits, retrying provider 429s."""
+        for attempt in range(self.max_retries + 1):
+            with span("llm_queue"):
+                self.acquire(user, tokens)
+            try:
+                with span("llm_call"):
+                    return fn()
+            except Exception as e:
+                if not is_rate_limit_error(e) or isinstance(e, RateLimitedError):
+                    raise
+
+                with self._cond:
+                    self.counters["rate_limited"] += 1
+                    # Our view of the window was optimistic; stop other callers too
+                    self.requests.drain()
+
+                if attempt == self.max_retries:
+                    raise RateLimitedError(f"LLM provider still rate limited after {attempt + 1} attempts") from e
+
+                delay = retry_after(e) or self.backoff * (2 ** attempt)
+                with self._cond:
+                    self.counters["retries"] += 1
+                time.sleep(delay * random.uniform(1.0, 1.5))
+
+    def stats(self):
+        with self._cond:
+            granted = self.counters["granted"]
+            return {
+                **self.counters,
+                "queue_depth": sum(len(q) for q in self._queues.values()),
+                "queue_wait_avg": (self._wait_total / granted) if granted else 0.0,
+                "queue_wait_max": self._wait_max
+            }
+
+
+llm_scheduler = LLMScheduler(
+    rpm=Config.LLM_RPM,
+    tpm=Config.LLM_TPM,
+    max_retries=Config.LLM_MAX_RETRIES,
+    queue_timeout=Config.LLM_QUEUE_TIMEOUT
+)
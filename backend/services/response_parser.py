@@ -0,0 +1,197 @@
+import json
+import re
+
+# Markers the agent (or an older prompt) may put in its final answer
+ANALYSIS_OPEN = "<analysis>"
+ANALYSIS_CLOSE = "</analysis>"
+TOOL_MARKER = "MANDATORY_JSON_RESULTS:"
+JSON_FENCE = "```json"
+
+_decoder = json.JSONDecoder()
+
+# Characters that can start a marker or a JSON payload
+_SPECIAL = re.compile(r"[<\[{`M]")
+
+# Give up waiting for a structure to complete after this many buffered characters
+MAX_PENDING = 64 * 1024
+
+# Runs of blank lines (e.g. where a JSON block was removed)
+_BLANK_LINES = re.compile(r"[ \t]*\n(?:[ \t]*\n)+")
+
+
+class ResponseParser:
+    """Single-pass, incremental parser for agent replies.
+
+    Text is fed in chunks and scanned once, left to right. Conversational
+    text is collected as-is; JSON property arrays (bare, ```json fenced,
+    after MANDATORY_JSON_RESULTS or wrapped in {"results": [...]}) are
+    decoded in place with raw_decode and removed from the text; an
+    <analysis> block is decoded and everything after it is dropped. When a
+    structure is split across chunks the parser waits for the rest instead
+    of rescanning from the start.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._text = []
+        self.properties = []
+        self.analysis = None
+        self._done = False  # past <analysis>: ignore the rest
+
+    def feed(self, chunk):
+        if self._done or not chunk:
+            return
+        self._buf += chunk
+        self._scan(final=False)
+
+    def close(self):
+        """Flushes anything still buffered and returns the parse result."""
+        if not self._done:
+            self._scan(final=True)
+        return self.result()
+
+    def result(self):
+        return {
+            # Keep the agent's line breaks; only squeeze the gaps removed blocks leave behind
+            "text": _BLANK_LINES.sub("\n\n", "".join(self._text)).strip(),
+            "properties": self.properties,
+            "analysis": self.analysis
+        }
+
+    # ---------- scanning ----------
+    def _scan(self, final):
+        buf = self._buf
+        pos = 0
+        n = len(buf)
+
+        while pos < n:
+            # Jump to the next character that can start a structure
+            nxt = _next_special(buf, pos)
+            if nxt == -1:
+                self._text.append(buf[pos:])
+                pos = n
+                break
+
+            self._text.append(buf[pos:nxt])
+            pos = nxt
+            consumed = self._structure_at(buf, pos, final)
+            if consumed is None:
+                # Incomplete structure; wait for more input
+                break
+            if self._done:
+                pos = n
+                break
+            if consumed == 0:
+                self._text.append(buf[pos])
+                pos += 1
+            else:
+                pos += consumed
+
+        self._buf = buf[pos:]
+        if final and self._buf:
+            self._text.append(self._buf)
+            self._buf = ""
+
+    def _structure_at(self, buf, pos, final):
+        """Consumes a structure starting at `pos`.
+
+        Returns the number of characters consumed, 0 if `pos` is plain text,
+        or None if more input is needed to decide.
+        """
+        rest = len(buf) - pos
+
+        for marker in (ANALYSIS_OPEN, TOOL_MARKER, JSON_FENCE):
+            if buf.startswith(marker, pos):
+                break
+            if not final and rest < len(marker) and marker.startswith(buf[pos:]):
+                return None
+        else:
+            marker = None
+
+        if marker == ANALYSIS_OPEN:
+            end = buf.find(ANALYSIS_CLOSE, pos)
+            if end == -1 and not final:
+                return None
+            body = buf[pos + len(ANALYSIS_OPEN):end if end != -1 else len(buf)]
+            self.analysis = _analysis(body)
+            self._done = True
+            return len(buf) - pos
+
+        if marker == TOOL_MARKER:
+            end = buf.find("\n", pos)
+            if end == -1 and not final:
+                return None
+            end = len(buf) if end == -1 else end
+            self._take_json(buf[pos + len(TOOL_MARKER):end])
+            return end - pos
+
+        if marker == JSON_FENCE:
+            end = buf.find("```", pos + len(JSON_FENCE))
+            if end == -1 and not final:
+                return None
+            end = len(buf) if end == -1 else end
+            self._take_json(buf[pos + len(JSON_FENCE):end])
+            return min(end + 3, len(buf)) - pos
+
+        if buf[pos] in "[{":
+            # Only arrays of objects and {"results": ...} count as payloads
+            head = buf[pos + 1:pos + 16].lstrip()
+            if not head:
+                return 0 if final else None
+            if buf[pos] == "[" and head[0] != "{":
+                return 0
+            if buf[pos] == "{" and not '"results"'.startswith(head[:9]):
+                return 0
+
+            try:
+                value, end = _decoder.raw_decode(buf, pos)
+            except ValueError:
+                if not final and rest < MAX_PENDING:
+                    return None
+                return 0
+            if self._add_properties(value):
+                return end - pos
+            return 0
+
+        return 0
+
+    def _take_json(self, body):
+        body = body.strip()
+        if not body:
+            return
+        try:
+            value, _ = _decoder.raw_decode(body)
+        except ValueError:
+            return
+        self._add_properties(value)
+
+    def _add_properties(self, value):
+        if isinstance(value, dict) and isinstance(value.get("results"), list):
+            value = value["results"]
+        if isinstance(value, list) and all(isinstance(v, dict) for v in value):
+            self.properties.extend(value)
+            return True
+        return False
+
+
+def _next_special(buf, pos):
+    match = _SPECIAL.search(buf, pos)
+    return match.start() if match else -1
+
+
+def _analysis(body):
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    # Harden: Ensure it's a dict, not a list
+    if isinstance(data, list) and data:
+        data = data[0]
+    return data if isinstance(data, dict) else None
+
+
+def parse_response(text):
+    """Parses a complete reply; see ResponseParser."""
+    parser = ResponseParser()
+    parser.feed(str(text or ""))
+    return parser.close()
@@ -0,0 +1,119 @@
+import logging
+from datetime import datetime
+from services.db import collection
+from services.response_parser import parse_response
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# One document per user:
+#   turns:   last SESSION_MAX_TURNS messages, capped on write with $push/$slice
+#   slots:   latest known action/city/bhk/budget, merged turn by turn
+# The prompt gets a one-line summary built from the slots, so what the user
+# asked for survives after the turns that said it fall off the capped array.
+sessions = collection("chat_sessions")
+
+SLOT_FIELDS = ("action", "city", "bhk", "budget")
+
+
+def ensure_indexes():
+    # Unique so two concurrent first-turn upserts can't create two sessions;
+    # replace the older non-unique index of the same name
+    existing = sessions.index_information().get("email_1")
+    if existing and not existing.get("unique"):
+        sessions.drop_index("email_1")
+    sessions.create_index("email", unique=True)
+
+
+def compact_text(text, limit=None):
+    """Strips analysis tags and JSON result blocks and truncates a message for storage."""
+    limit = limit or Config.SESSION_TURN_CHARS
+    text = str(text or "")
+
+    # Same single-pass parse the chat route uses: drops analysis and JSON payloads
+    text = parse_response(text)["text"]
+
+    if len(text) > limit:
+        text = text[:limit - 3].rstrip() + "..."
+    return text
+
+
+def summarize_slots(slots):
+    """One-line recap of what the user is looking for."""
+    if not slots:
+        return ""
+
+    parts = []
+    if slots.get("bhk"):
+        parts.append(f"{slots['bhk']}BHK")
+    parts.append("home")
+    if slots.get("action"):
+        parts.insert(0, f"wants to {slots['action'].lower()} a")
+    else:
+        parts.insert(0, "is looking at a")
+    if slots.get("city"):
+        parts.append(f"in {slots['city']}")
+    if slots.get("budget"):
+        parts.append(f"with a budget of about ₹{int(slots['budget']):,}")
+    return "User " + " ".join(parts) + "."
+
+
+# ---------- WRITE ----------
+def record_turn(email, message, response, slots=None):
+    """Appends one user/assistant exchange and merges the newly extracted slots."""
+    if not Config.SESSION_MEMORY_ENABLED or not email:
+        return
+
+    now = datetime.utcnow()
+    # Dotted keys merge into the stored slots without reading them first
+    slot_updates = {f"slots.{k}": v for k, v in (slots or {}).items() if k in SLOT_FIELDS and v}
+
+    update = {
+        "$push": {"turns": {
+            "$each": [
+                {"role": "user", "content": compact_text(message), "ts": now},
+                {"role": "assistant", "content": compact_text(response), "ts": now}
+            ],
+            # Keep only the most recent turns; the document never grows past this
+            "$slice": -Config.SESSION_MAX_TURNS
+        }},
+        "$set": {**slot_updates, "last_updated": now},
+        "$inc": {"turn_count": 1},
+        # Drop the legacy unbounded history array on first write
+        "$unset": {"history": ""}
+    }
+
+    try:
+        sessions.update_one({"email": email}, update, upsert=True)
+    except Exception as e:
+        logger.error("Error saving session memory: %s", e)
+
+
+def clear_session(email):
+    sessions.delete_one({"email": email})
+
+
+# ---------- READ ----------
+def load_session(email):
+    """Returns the slot summary, slots and recent turns (or empty values)."""
+    empty = {"summary": "", "slots": {}, "turns": []}
+    if not Config.SESSION_MEMORY_ENABLED or not email:
+        return empty
+
+    try:
+        session = sessions.find_one(
+            {"email": email},
+            {"slots": 1, "turns": {"$slice": -Config.SESSION_MAX_TURNS}}
+        )
+    except Exception as e:
+        logger.error("Error loading session memory: %s", e)
+        return empty
+
+    if not session:
+        return empty
+    return {
+        "summary": summarize_slots(session.get("slots")),
+        "slots": session.get("slots", {}),
+        "turns": session.get("turns", [])
+    }
+
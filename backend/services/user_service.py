@@ -1,6 +1,34 @@
+import logging
+import atexit
 from services.db import get_db
+from services.write_behind import WriteBehindQueue
 from datetime import datetime
-from models.property_model import create_property
+from bson.objectid import ObjectId
+from models.property_model import build_property_doc, insert_properties
+from config import Config
+from utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Inquiry documents (and auto-listings from "Sell" inquiries) are written in
+# the background so chat responses don't wait on Mongo.
+inquiry_writer = WriteBehindQueue(
+    batch_size=Config.INQUIRY_BATCH_SIZE,
+    flush_interval=Config.INQUIRY_FLUSH_INTERVAL,
+    max_queue=Config.INQUIRY_QUEUE_MAX,
+    handlers={"properties": insert_properties}
+)
+atexit.register(inquiry_writer.stop)
+
+
+def _write(collection, doc):
+    """Queues a write, or performs it inline when async logging is off or the queue is full."""
+    if Config.INQUIRY_ASYNC and inquiry_writer.submit(collection.name, doc):
+        return
+    if collection.name == "properties":
+        insert_properties([doc])
+    else:
+        collection.insert_one(doc)
 
 def parse_budget(budget_str):
     """Converts budget strings like '2cr', '50L', '80k' to numbers."""
@@ -31,6 +59,7 @@ def parse_budget(budget_str):
     except:
         return 0
 
+@timed("log_inquiry")
 def log_inquiry(email, message, analysis_data):
     """Logs a user inquiry to specific collections based on intent."""
     db = get_db()
@@ -51,6 +80,7 @@ def log_inquiry(email, message, analysis_data):
     parsed_budget = parse_budget(raw_budget)
     
     inquiry = {
+        "_id": ObjectId(),
         "email": email,
         "message": message,
         "category": category,
@@ -63,8 +93,8 @@ def log_inquiry(email, message, analysis_data):
         "timestamp": datetime.utcnow()
     }
     
-    result = collection.insert_one(inquiry)
-    print(f"Logged inquiry to {collection.name} for {email}")
+    _write(collection, inquiry)
+    logger.info("Logged inquiry to %s", collection.name, extra={"email": email, "sampled": True})
 
     # NEW: If it's a "Sell" inquiry, automatically list it as a property for buyers
     if category == "Sell":
@@ -84,9 +114,9 @@ def log_inquiry(email, message, analysis_data):
                 "listed_by": email,
                 "action": "Buy" # List as 'Buy' so it shows up for buyers
             }
-            create_property(property_data)
-            print(f"Automatically created property listing for {email} in {location}")
+            _write(db.properties, build_property_doc(property_data))
+            logger.info("Automatically created property listing in %s", location, extra={"email": email})
         except Exception as e:
-            print(f"Error creating automatic property listing: {e}")
+            logger.error("Error creating automatic property listing: %s", e)
 
-    return str(result.inserted_id)
+    return str(inquiry["_id"])
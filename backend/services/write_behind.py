@@ -0,0 +1,117 @@
+import logging
+import os
+import queue
+import threading
+import time
+from services.db import get_db
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Buffers inserts off the request path and flushes them in batches.
+
+    Documents are grouped per collection and written with one unordered
+    insert_many whenever a collection reaches `batch_size` documents or
+    `flush_interval` seconds have passed. The queue is bounded: when it is
+    full, submit() waits up to `put_timeout` seconds and then returns False
+    so the caller can write synchronously instead of growing memory.
+    """
+
+    def __init__(self, batch_size=100, flush_interval=1.0, max_queue=10000, put_timeout=0.05, handlers=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.handlers = handlers or {}
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+        self._stopping = False
+        self.counters = {"enqueued": 0, "written": 0, "rejected": 0, "errors": 0, "batches": 0}
+
+    def _ensure_worker(self):
+        # Started lazily, and again in a forked child where the thread is gone
+        if self._worker is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._worker.start()
+
+    def submit(self, collection_name, doc):
+        """Queues one document; returns False when the caller should write it itself."""
+        if self._stopping:
+            return False
+
+        self._ensure_worker()
+        try:
+            self._queue.put((collection_name, doc), timeout=self.put_timeout)
+        except queue.Full:
+            self._count("rejected")
+            return False
+
+        self._count("enqueued")
+        return True
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def _run(self):
+        pending = {}
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is not None:
+                if item[0] is None:  # stop sentinel
+                    self._flush_all(pending)
+                    self._queue.task_done()
+                    return
+
+                collection_name, doc = item
+                batch = pending.setdefault(collection_name, [])
+                batch.append(doc)
+                self._queue.task_done()
+                if len(batch) >= self.batch_size:
+                    self._flush(collection_name, pending.pop(collection_name))
+
+            if time.monotonic() >= deadline:
+                self._flush_all(pending)
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush_all(self, pending):
+        for collection_name in list(pending):
+            self._flush(collection_name, pending.pop(collection_name))
+
+    def _flush(self, collection_name, docs):
+        try:
+            handler = self.handlers.get(collection_name)
+            if handler:
+                handler(docs)
+            else:
+                get_db()[collection_name].insert_many(docs, ordered=False)
+            self._count("written", len(docs))
+        except Exception as e:
+            self._count("errors", len(docs))
+            logger.error("Error flushing %d documents to %s: %s", len(docs), collection_name, e)
+        self._count("batches")
+
+    def stop(self, timeout=10):
+        """Flushes everything still queued and stops the worker."""
+        self._stopping = True
+        if self._worker is None or self._pid != os.getpid() or not self._worker.is_alive():
+            return
+        self._queue.put((None, None))
+        self._worker.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {"queue_depth": self._queue.qsize(), **self.counters}
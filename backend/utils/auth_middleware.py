@@ -1,7 +1,83 @@
+from collections import OrderedDict
 from functools import wraps
 from flask import request, jsonify
+import hashlib
+import threading
+import time
 import jwt
 from config import Config
+from utils.metrics import span
+
+
+class TokenCache:
+    """Bounded LRU of verified tokens -> decoded claims.
+
+    Entries are keyed by a SHA-256 digest of the token, so raw tokens are not
+    kept in memory, and only tokens that passed a full jwt.decode are stored.
+    A hit past the token's `exp` is dropped and reported as expired.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        key = self._key(token)
+        with self._lock:
+            claims = self._entries.get(key)
+            if claims is None:
+                self.misses += 1
+                return None
+
+            exp = claims.get("exp")
+            if exp is not None and exp <= time.time():
+                del self._entries[key]
+                raise jwt.ExpiredSignatureError("Signature has expired")
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def put(self, token, claims):
+        if self.max_entries <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = claims
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache(max_entries=Config.JWT_CACHE_SIZE)
+
+
+def decode_token(token):
+    """Returns the verified claims of an access token, using the decode cache."""
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = jwt.decode(
+            token,
+            Config.JWT_SECRET,
+            algorithms=["HS256"]
+        )
+        token_cache.put(token, claims)
+    return claims
 
 
 def token_required(f):
@@ -22,14 +98,11 @@ def token_required(f):
             return jsonify({"error": "Token missing"}), 401
 
         try:
-            data = jwt.decode(
-                token,
-                Config.JWT_SECRET,
-                algorithms=["HS256"]
-            )
-
-            # attach user info to request
-            request.user = data
+            with span("jwt"):
+                data = decode_token(token)
+
+            # attach user info to request (a copy, so handlers can't alter the cached claims)
+            request.user = dict(data)
 
         except jwt.ExpiredSignatureError:
             return jsonify({"error": "Token expired"}), 401
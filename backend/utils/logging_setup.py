@@ -0,0 +1,160 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from flask import request, g
+from config import Config
+
+# Correlates every log line written while handling one request
+request_id = ContextVar("request_id", default=None)
+
+# Pass as `extra=SAMPLED` (or set "sampled": True in extra) on high-volume
+# INFO/DEBUG lines so only LOG_SAMPLE_RATE of them are kept
+SAMPLED = {"sampled": True}
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "sampled"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id and any extra fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Stamps the request id and drops unsampled high-volume records.
+
+    Attached to the queue handler, so it runs in the thread that logs, where
+    the request-id context variable is set, and before anything is queued.
+    """
+
+    def __init__(self, sample_rate):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.sampled_out = 0
+
+    def filter(self, record):
+        if getattr(record, "sampled", False) and record.levelno < logging.WARNING:
+            if random.random() >= self.sample_rate:
+                self.sampled_out += 1
+                return False
+        record.request_id = request_id.get()
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message and traceback now (arguments may change or hold
+        # unpicklable state), but leave JSON formatting to the writer thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_lock = threading.Lock()
+_state = {}
+
+
+def configure_logging():
+    """Routes the root logger through a bounded queue to a stdout writer thread.
+
+    Safe to call more than once; only the first call installs handlers.
+    """
+    with _lock:
+        if _state:
+            return
+
+        stream = logging.StreamHandler(sys.stdout)
+        if Config.LOG_FORMAT == "json":
+            stream.setFormatter(JsonFormatter())
+        else:
+            stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=Config.LOG_QUEUE_SIZE))
+        context = ContextFilter(Config.LOG_SAMPLE_RATE)
+        handler.addFilter(context)
+
+        listener = logging.handlers.QueueListener(handler.queue, stream, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+
+        root = logging.getLogger()
+        root.handlers = [handler]
+        root.setLevel(Config.LOG_LEVEL)
+
+        _state.update(handler=handler, context=context, listener=listener)
+
+
+def logging_stats():
+    if not _state:
+        return {}
+    return {
+        "queue_depth": _state["handler"].queue.qsize(),
+        "dropped": _state["handler"].dropped,
+        "sampled_out": _state["context"].sampled_out
+    }
+
+
+def init_request_logging(app):
+    """Gives every request an id (from X-Request-ID or a new one) and echoes it back."""
+
+    @app.before_request
+    def assign_request_id():
+        rid = request.headers.get("X-Request-ID", "")[:64] or uuid.uuid4().hex
+        g.request_id = rid
+        g.request_id_token = request_id.set(rid)
+
+    @app.after_request
+    def add_request_id_header(response):
+        rid = getattr(g, "request_id", None)
+        if rid:
+            response.headers["X-Request-ID"] = rid
+        return response
+
+    @app.teardown_request
+    def clear_request_id(exc):
+        token = g.pop("request_id_token", None)
+        if token is not None:
+            try:
+                request_id.reset(token)
+            except ValueError:  # torn down from a different context
+                request_id.set(None)
@@ -0,0 +1,160 @@
+import logging
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from flask import Blueprint, Response, request, g
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) shared by every histogram; +Inf is implicit
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Span durations (ms) for the current request, for the Server-Timing header
+_request_spans = ContextVar("request_spans", default=None)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *labels):
+        idx = bisect_left(BUCKETS, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(BUCKETS) + 1) + [0.0]
+            series[idx] += 1
+            series[-1] += seconds
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+
+        for labels, series in sorted(snapshot.items()):
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels))
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, count in zip(BUCKETS, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+            cumulative += series[len(BUCKETS)]
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+span_seconds = Histogram("haven_span_seconds", "Time spent in instrumented stages", ("span",))
+request_seconds = Histogram("haven_http_request_seconds", "HTTP request latency", ("endpoint", "method", "status"))
+
+# name -> callable returning a dict of numbers, exported as gauges
+_stats_sources = {}
+
+
+def register_stats(name, fn):
+    """Exports the numeric values of fn() as haven_<name>_<key> gauges on /metrics."""
+    _stats_sources[name] = fn
+
+
+# ---------- SPANS ----------
+@contextmanager
+def span(name):
+    """Times a block into the span histogram and the current request's Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        span_seconds.observe(elapsed, name)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans[name] = spans.get(name, 0.0) + elapsed * 1000
+
+
+def timed(name):
+    """Decorator form of span()."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ---------- FLASK ----------
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    lines = span_seconds.render() + request_seconds.render()
+
+    for source, fn in sorted(_stats_sources.items()):
+        try:
+            values = fn()
+        except Exception as e:
+            logger.error("Error collecting %s stats: %s", source, e)
+            continue
+        for key, value in values.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"haven_{source}_{key}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+def init_metrics(app):
+    """Times every request and adds a Server-Timing header with its spans."""
+    if not Config.METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+        g.request_spans_token = _request_spans.set({})
+
+    @app.after_request
+    def record_request(response):
+        start = getattr(g, "request_start", None)
+        if start is None:
+            return response
+
+        elapsed = time.perf_counter() - start
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        request_seconds.observe(elapsed, endpoint, request.method, str(response.status_code))
+
+        # Streamed bodies are still running here; their header covers setup only
+        spans = _request_spans.get() or {}
+        timings = [f"{name};dur={ms:.2f}" for name, ms in spans.items()]
+        timings.append(f"total;dur={elapsed * 1000:.2f}")
+        response.headers["Server-Timing"] = ", ".join(timings)
+        return response
+
+    @app.teardown_request
+    def clear_request_spans(exc):
+        token = g.pop("request_spans_token", None)
+        if token is not None:
+            try:
+                _request_spans.reset(token)
+            except ValueError:  # torn down from a different context
+                _request_spans.set(None)
+
+    app.register_blueprint(metrics_bp)
@@ -1,7 +1,90 @@
 import bcrypt
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+
+
+class HashingBusyError(Exception):
+    """Raised when too many password hashes are already queued."""
+
+
+# Worker functions run in the pool processes; keep them at module level so they pickle
+def _hashpw(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _checkpw(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded process pool so hashing bursts don't pin request threads.
+
+    At most `max_pending` hashes may be queued or running; beyond that calls
+    fail fast with HashingBusyError instead of stacking up latency. With
+    workers=0 bcrypt runs inline on the calling thread.
+    """
+
+    def __init__(self, workers=None, max_pending=64, rounds=12):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.rounds = rounds
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Recreated in forked children, which can't use the parent's pool
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    # forkserver children start from a clean single-threaded process
+                    ctx = multiprocessing.get_context("forkserver")
+                    ctx.set_forkserver_preload(["bcrypt"])
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusyError("Too many password operations in progress")
+        try:
+            if self.workers == 0:
+                return fn(*args)
+            return self._pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> bytes:
+        return self._run(_hashpw, password.encode(), self.rounds)
+
+    def verify(self, password: str, hashed: bytes) -> bool:
+        return self._run(_checkpw, password.encode(), hashed)
+
+    def needs_rehash(self, hashed: bytes) -> bool:
+        """True when a stored hash was made with a different cost factor."""
+        try:
+            return int(hashed.split(b"$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    workers=Config.BCRYPT_WORKERS,
+    max_pending=Config.BCRYPT_MAX_PENDING,
+    rounds=Config.BCRYPT_ROUNDS
+)
+
 
 def hash_password(password: str):
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+    return password_hasher.hash(password)
+
 
 def verify_password(password: str, hashed: bytes):
-    return bcrypt.checkpw(password.encode(), hashed)
+    return password_hasher.verify(password, hashed)
@@ -1,18 +1,10 @@
-import jwt
-import datetime
-import os
-from functools import wraps
-from flask import request
-
-
-# Note: token_required is also in auth_middleware.py, this one is often used for simpler checks
-SECRET = os.getenv("JWT_SECRET")
-
-
 import jwt
 from datetime import datetime, timedelta
 from config import Config
 
+# token_required lives in auth_middleware; re-exported so both imports share one decode path
+from utils.auth_middleware import token_required  # noqa: F401
+
 
 def generate_access_token(email, role):
     payload = {
@@ -32,28 +24,3 @@ def generate_refresh_token(email):
     }
 
     return jwt.encode(payload, Config.JWT_SECRET, algorithm="HS256")
-
-
-# 🔒 Auth decorator
-def token_required(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-
-        token = request.headers.get("Authorization")
-
-        if not token:
-            return {"error": "Token missing"}, 401
-
-        try:
-            decoded = jwt.decode(token, SECRET, algorithms=["HS256"])
-            request.user = decoded["email"]
-
-        except jwt.ExpiredSignatureError:
-            return {"error": "Token expired"}, 401
-
-        except jwt.InvalidTokenError:
-            return {"error": "Invalid token"}, 401
-
-        return func(*args, **kwargs)
-
-    return wrapper